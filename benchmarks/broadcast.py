@@ -0,0 +1,115 @@
+# load test of the server's broadcasts: how long moves take to reach 50 clients while one more client is reading slowly
+# compares the server against one that writes to each client in turn, waiting for each to drain, as it did before connections had writer tasks
+# usage: python benchmarks/broadcast.py [fast clients [moves]]
+# clients still waiting for moves after 30 seconds are given up on, and the moves they missed count as undelivered
+
+import sys, asyncio, json, time, random, socket, multiprocessing
+import continuousEngine
+from continuousEngine.network.server import NetworkGameServer, view
+from continuousEngine.network.codec import JsonCodec
+
+GAME = 'go'
+SLOW_READ_INTERVAL = .5
+MOVE_INTERVAL = .02
+
+# socket buffers are kept small, so a client that isn't reading backs up after a few moves, like it would over a slow network, rather than after megabytes
+class SmallBuffers:
+    async def a(self, reader, writer):
+        writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        await super().a(reader, writer)
+
+class QueuedServer(SmallBuffers, NetworkGameServer):
+    pass
+
+class SequentialServer(SmallBuffers, NetworkGameServer):
+    async def broadcast_move(self, game_id, move, l, states, h, timeinfo):
+        for player in l:
+            writer = player["client"][1]
+            writer.write((json.dumps({"action":"move", "state":states[view(self.game_class(game_id), player["team"])], "move":move})+"\n").encode())
+            await writer.drain()
+
+def serve(server_class, port):
+    async def main():
+        server = await asyncio.start_server(server_class(clean=True, unsafe=True).a, host='localhost', port=port)
+        await server.serve_forever()
+    asyncio.run(main())
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+async def connect(port, slow=False):
+    if not slow:
+        return await asyncio.open_connection(host='localhost', port=port, limit=2**22)
+    # a small receive buffer, so the server's writes back up quickly
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ('localhost', port))
+    return await asyncio.open_connection(sock=sock, limit=2**10)
+
+send = lambda client, message: client[1].write((json.dumps(message)+"\n").encode())
+
+def busy_state():
+    # a go board with some pieces on it, so each state is a few KB
+    random.seed(0)
+    game = continuousEngine.game_class(GAME)(headless=True)
+    pieces = {t:[] for t in game.teams}
+    while sum(map(len, pieces.values())) < 30:
+        p = continuousEngine.Point(random.uniform(-9, 9), random.uniform(-9, 9))
+        if +p < 8.5**2 and not any(p>>q < 4.4 for ps in pieces.values() for q in map(lambda c: continuousEngine.Point(*c), ps)):
+            pieces[game.teams[len(pieces[game.teams[0]]) > len(pieces[game.teams[1]])]].append(p.coords)
+    return game.teams, (game.teams[0], {t:0 for t in game.teams}, pieces, 0)
+
+async def run(port, fast, moves):
+    teams, state = busy_state()
+    mover = await connect(port)
+    send(mover, {"action":"create", "name":GAME, "id":"load", "args":[], "kwargs":{"timectrl":None}})
+    send(mover, {"action":"join", "user":"mover", "id":"load", "team":"spectator"})
+    send(mover, {"action":"override_state", "state":state})
+    clients = [await connect(port) for _ in range(fast)]
+    slow = await connect(port, slow=True)
+    for i, c in enumerate(clients+[slow]):
+        send(c, {"action":"join", "user":"c{}".format(i), "id":"load", "team":"spectator"})
+    await asyncio.sleep(1)
+
+    sent, latencies = {}, []
+    async def read_fast(client):
+        while True:
+            m = await JsonCodec.read(client[0])
+            if m.get("action")=="move" and m["move"] and "n" in m["move"]:
+                latencies.append(time.perf_counter() - sent[m["move"]["n"]])
+                if m["move"]["n"] == moves-1: return
+    async def read_slow():
+        while True:
+            await asyncio.sleep(SLOW_READ_INTERVAL)
+            await slow[0].read(2**10)
+    readers = [asyncio.create_task(read_fast(c)) for c in clients]
+    slow_reader = asyncio.create_task(read_slow())
+    for n in range(moves):
+        sent[n] = time.perf_counter()
+        send(mover, {"action":"move", "move":{"player":teams[n%2], "action":"skip", "n":n}})
+        await asyncio.sleep(MOVE_INTERVAL)
+    try:
+        await asyncio.wait_for(asyncio.gather(*readers), 30)
+    except asyncio.TimeoutError:
+        pass
+    slow_reader.cancel()
+    return latencies
+
+def bench(fast=50, moves=300):
+    print('{} fast clients, 1 slow client, {} moves'.format(fast, moves))
+    print('{:<12}{:>10}{:>10}{:>10}{:>10}{:>12}'.format('server', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)', 'delivered'))
+    for name, server_class in (('sequential', SequentialServer), ('queued', QueuedServer)):
+        port = free_port()
+        process = multiprocessing.Process(target=serve, args=(server_class, port), daemon=True)
+        process.start()
+        time.sleep(2)
+        latencies = sorted(asyncio.run(run(port, fast, moves)))
+        process.terminate()
+        percentile = lambda q: latencies[min(len(latencies)-1, int(q*len(latencies)))] * 1000 if latencies else float('nan')
+        print('{:<12}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>12}'.format(name, percentile(.5), percentile(.9), percentile(.99), percentile(1), '{}/{}'.format(len(latencies), fast*moves)))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
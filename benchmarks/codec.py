@@ -0,0 +1,44 @@
+# benchmark of the network codecs: bytes per message and encode/decode time, for each game's initial state and a late-game state
+# late-game states come from letting the battlecode example players play, so only games with an example player have one
+# usage: python benchmarks/codec.py [moves]
+
+import sys, random, timeit, importlib
+import continuousEngine
+from continuousEngine.network.codec import CODECS
+
+def late_state(name, moves):
+    try:
+        example = importlib.import_module('continuousEngine.battlecode.example{}player'.format(name))
+    except ImportError:
+        return None
+    game_class = continuousEngine.game_class(name)
+    game = game_class(headless=True)
+    players = {t: example.Player(game_class, name, t) for t in game.teams}
+    for player in players.values(): player._receive_state(game.get_state(player.team))
+    try:
+        for _ in range(moves):
+            if game.is_over(): break
+            move = players[game.turn].make_move()
+            if not game.attemptMove(move): break
+            for player in players.values(): player._receive_move(move, game.get_state(player.team))
+    except Exception:
+        # the example players aren't perfect; stop wherever one of them fails
+        pass
+    return game.save_state()
+
+def bench(moves=60):
+    random.seed(0)
+    print('{:<10}{:<9}{:<9}{:>9}{:>13}{:>13}'.format('game', 'state', 'codec', 'bytes', 'encode (us)', 'decode (us)'))
+    for name in continuousEngine.ALL_GAMES:
+        states = [('initial', continuousEngine.game_class(name)(headless=True).save_state()), ('late', late_state(name, moves))]
+        for label, state in states:
+            if state is None: continue
+            message = {"action":"move", "state":state, "move":None}
+            for codec in CODECS.values():
+                frame = codec.encode(message)
+                number = max(1, 20000 // len(frame))
+                times = [min(timeit.repeat(f, number=number, repeat=3)) / number * 10**6 for f in (lambda: codec.encode(message), lambda: codec.decode(frame))]
+                print('{:<10}{:<9}{:<9}{:>9}{:>13.1f}{:>13.1f}'.format(name, label, codec.name, len(frame), *times))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
@@ -0,0 +1,41 @@
+# benchmark of answering list: building every game's info for each request, as the server used to, against the lobby it keeps up to date
+# usage: python benchmarks/lobby.py [game counts ...]
+
+import sys, os, timeit, contextlib
+from continuousEngine.network.server import NetworkGameServer
+from continuousEngine.network.codec import JsonCodec
+
+REQUESTS = 20
+
+def lobby(n):
+    server = NetworkGameServer(clean=True)
+    for i in range(n):
+        id = 'game{}'.format(i)
+        server.games[id] = {"game_type":"go", "players":[{"user":"u{}".format(i), "team":"black", "client":None, "deltas":False}] if i%2 else [],
+            "loaded":False, "args":[], "kwargs":{"timectrl":None}, "moves":None, "teams":["black", "white"]}
+    server.update_lobby(*server.games)
+    return server
+
+# what list cost before the lobby: every game's info, printed and then encoded
+def rebuilt(server):
+    result = {i:server.get_game_info(i) for i in server.games}
+    print(result, flush=True)
+    return JsonCodec.encode(result)
+
+def bench(counts=(100, 1000, 10000)):
+    print('{:>7} {:<22}{:>12}{:>12}{:>10}'.format('games', 'request', 'old (us)', 'new (us)', 'speedup'))
+    for n in counts:
+        server = lobby(n)
+        cases = [
+            ('list', lambda: rebuilt(server), lambda: server.encoded_list(JsonCodec)),
+            ('list page of 20', lambda: rebuilt(server), lambda: server.encoded_list(JsonCodec, None, n//2, 20)),
+            # a player joining changes the lobby, so the next list is encoded again
+            ('list after a join', lambda: rebuilt(server), lambda: (server.update_lobby('game0'), server.encoded_list(JsonCodec))),
+        ]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            times = [[min(timeit.repeat(f, number=REQUESTS, repeat=3)) / REQUESTS * 10**6 for f in (old, new)] for _, old, new in cases]
+        for (name, _, _), (old, new) in zip(cases, times):
+            print('{:>7} {:<22}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(n, name, old, new, old/new))
+
+if __name__=="__main__":
+    bench(*([list(map(int, sys.argv[1:]))] if sys.argv[1:] else []))
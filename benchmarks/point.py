@@ -0,0 +1,58 @@
+# microbenchmark of Point operators: the old generator-based Point against the current one
+# usage: python benchmarks/point.py [number]
+
+import sys, timeit
+from math import cos, sin
+from continuousEngine.core.geometry import Point
+
+# the Point class as it was before it used __slots__, kept here for comparison
+class LegacyPoint:
+    def __init__(self, x, y, r=0, theta=0):
+        self.x = x + r * cos(theta)
+        self.y = y + r * sin(theta)
+        self.coords = (self.x,self.y)
+    __iter__ = lambda self: iter(self.coords)
+    __getitem__ = lambda self, v: self.coords[v]
+    __repr__ = lambda self: "Point{}".format(self.coords)
+    __eq__ = lambda self, other: isinstance(other, LegacyPoint) and self.coords == other.coords
+    __ne__ = lambda self, other: not self == other
+    __hash__ = lambda self: hash(self.coords)
+    __bool__ = lambda self: True
+    __add__ = lambda p1, p2: LegacyPoint(*(p1[i]+p2[i] for i in range(2)))
+    __sub__ = lambda p1, p2: LegacyPoint(*(p1[i]-p2[i] for i in range(2)))
+    __mul__ = lambda p, c: LegacyPoint(*(p[i]*c for i in range(2)))
+    __rmul__ = lambda p, c: LegacyPoint(*(c*p[i] for i in range(2)))
+    __truediv__ = lambda p, c: LegacyPoint(*(p[i]/c for i in range(2)))
+    __pos__ = lambda p: sum(x**2 for x in p)
+    __matmul__ = lambda p, l: LegacyPoint(*(l*x/(+p)**.5 for x in p)) if p != LegacyPoint(0,0) else LegacyPoint(0,0)
+    __invert__ = lambda p: LegacyPoint(p.y, -p.x)
+    __mod__ = lambda p1, p2: (p1 + p2)/2
+    __xor__ = lambda p1, p2: p1.x*p2.y - p1.y*p2.x
+    __rshift__ = lambda p1, p2: +(p1-p2)
+    __and__ = lambda p1, p2: sum(p1[i]*p2[i] for i in range(2))
+
+OPERATIONS = [
+    ('Point(x,y)',  'P(1.5, -2.5)'),
+    ('p + q',       'p + q'),
+    ('p - q',       'p - q'),
+    ('p * c',       'p * 1.5'),
+    ('p / c',       'p / 1.5'),
+    ('+p',          '+p'),
+    ('p @ l',       'p @ 2'),
+    ('~p',          '~p'),
+    ('p % q',       'p % q'),
+    ('p ^ q',       'p ^ q'),
+    ('p >> q',      'p >> q'),
+    ('p & q',       'p & q'),
+    ('p == q',      'p == q'),
+    ('hash(p)',     'hash(p)'),
+]
+
+def bench(number=200000):
+    print('{:<12}{:>12}{:>12}{:>10}'.format('operation', 'old (ns)', 'new (ns)', 'speedup'))
+    for name, stmt in OPERATIONS:
+        times = [min(timeit.repeat(stmt, number=number, repeat=3, globals={'P':P, 'p':P(1.5,-2.5), 'q':P(-.5,4)})) / number * 10**9 for P in (LegacyPoint, Point)]
+        print('{:<12}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(name, *times, times[0]/times[1]))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
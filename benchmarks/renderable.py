@@ -0,0 +1,45 @@
+# microbenchmark of reading Renderable attributes: the old closure-based Renderable against the current one
+# usage: python benchmarks/renderable.py [number]
+
+import sys, timeit
+from continuousEngine.core.continuousEngine import Game, Renderable
+
+# the Renderable attribute handling as it was when every attribute was saved as a function, kept here for comparison
+class LegacyRenderable:
+    __setattr__ = lambda self, k, v: self._dict.__setitem__(k[3:], v) if k[:3]=='GET' else self._dict.__setitem__(k, lambda game: v)
+    __getattr__ = lambda self, k: self._dict[k](self.game)
+    def __init__(self, game):
+        self.__dict__['game'] = game
+        self.__dict__['_dict'] = {}
+        self.visible = True
+
+class FakeGame:
+    frame = None
+    changes = {}
+    add = lambda self, obj, layer: None
+    # setting an attribute tells the game, as it does for a real one
+    changed = Game.changed
+
+OPERATIONS = [
+    ('constant',            'obj.color'),
+    ('GET',                 'obj.loc'),
+    ('GET, memoized',       'obj.loc'),
+    ('set constant',        'obj.color = 3'),
+]
+
+def bench(number=500000):
+    print('{:<20}{:>12}{:>12}{:>10}'.format('operation', 'old (ns)', 'new (ns)', 'speedup'))
+    for name, stmt in OPERATIONS:
+        times = []
+        for cls in (LegacyRenderable, Renderable):
+            game = FakeGame()
+            obj = cls(game) if cls is LegacyRenderable else cls(game, 0)
+            obj.color = (0,0,0)
+            obj.GETloc = lambda game: sum(range(20))
+            # as during Game.render
+            if 'memoized' in name: game.frame = 1
+            times.append(min(timeit.repeat(stmt, number=number, repeat=3, globals={'obj':obj})) / number * 10**9)
+        print('{:<20}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(name, *times, times[0]/times[1]))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
@@ -0,0 +1,27 @@
+# benchmark of what logging a received move costs the server's event loop: printing it with flush, as the server used to, against the queued log
+# output goes to a file, as it would when the server's stdout is redirected
+# usage: python benchmarks/server_log.py [number]
+
+import sys, timeit, tempfile, logging
+import continuousEngine.network.log as log
+
+MESSAGE = {"action":"move", "move":{"player":"black", "action":"place", "location":[1.2345678901234567, -7.654321098765432]}}
+
+def bench(number=20000):
+    with tempfile.TemporaryFile('w') as f:
+        cases = [
+            ('print, flushed',              lambda: print("received {}".format(MESSAGE), flush=True, file=f), None),
+            ('log, INFO',                   lambda: log.log(logging.INFO, "received", message=MESSAGE), logging.INFO),
+            ('log, DEBUG sampled 1/100',    lambda: log.log(logging.DEBUG, "received", sample=True, message=MESSAGE), logging.DEBUG),
+            ('log, below level',            lambda: log.log(logging.DEBUG, "received", sample=True, message=MESSAGE), logging.INFO),
+        ]
+        print('{:<28}{:>12}'.format('', 'ns/message'))
+        for name, call, level in cases:
+            if level is not None:
+                log.start(level, 100, f)
+            t = min(timeit.repeat(call, number=number, repeat=3)) / number * 10**9
+            log.stop()
+            print('{:<28}{:>12.0f}'.format(name, t))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
@@ -0,0 +1,95 @@
+# load test of the server with games in its own process, in a thread of their own, and sharded across worker processes
+# a number of go games are played at once, each by a client sending all of a game's moves as fast as it can, while another client asks for the lobby every 20ms
+# reports how many moves a second the server gets through, and how long the lobby takes to answer while it does
+# usage: python benchmarks/shards.py [games [moves [shards]]]
+# shards can only make moves faster with as many cores as shards; with fewer, they (and the game thread) still keep the lobby answering
+
+import sys, os, asyncio, json, time, random, socket, multiprocessing
+import continuousEngine
+from continuousEngine.network.server import NetworkGameServer
+from continuousEngine.network.codec import JsonCodec
+from continuousEngine.battlecode.examplegoplayer import Player
+
+GAME = 'go'
+LIST_INTERVAL = .02
+
+def serve(options, port, stop):
+    async def main():
+        game_server = NetworkGameServer(clean=True, unsafe=True, **options)
+        server = await asyncio.start_server(game_server.a, host='localhost', port=port)
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        server.close()
+        for shard in game_server.shards:
+            shard.shutdown()
+    asyncio.run(main())
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+send = lambda client, message: client[1].write((json.dumps(message)+"\n").encode())
+
+# a game's worth of legal moves, played by the example player
+def legal_moves(n):
+    random.seed(0)
+    game = continuousEngine.game_class(GAME)(headless=True, timectrl=None)
+    players = {t:Player(type(game), GAME, t) for t in game.teams}
+    for p in players.values(): p._receive_state(game.save_state())
+    moves = []
+    while len(moves) < n:
+        move = players[game.turn].make_move()
+        if game.attemptMove(move):
+            moves.append(move)
+            for p in players.values(): p._receive_move(move, None)
+    return moves
+
+async def run(port, games, moves):
+    movers = []
+    for i in range(games):
+        mover = await asyncio.open_connection(host='localhost', port=port, limit=2**24)
+        send(mover, {"action":"create", "name":GAME, "id":"g{}".format(i), "args":[], "kwargs":{"timectrl":None}})
+        send(mover, {"action":"join", "user":"mover", "id":"g{}".format(i), "team":"spectator"})
+        while (await JsonCodec.read(mover[0])).get("action") != "history": pass
+        movers.append(mover)
+    lobby = await asyncio.open_connection(host='localhost', port=port, limit=2**24)
+
+    async def play(mover):
+        for move in moves:
+            send(mover, {"action":"move", "move":move})
+        received = 0
+        while received < len(moves):
+            m = await JsonCodec.read(mover[0])
+            received += m.get("action") == "move"
+    latencies, done = [], asyncio.Event()
+    async def probe():
+        while not done.is_set():
+            t = time.perf_counter()
+            send(lobby, {"action":"list"})
+            await JsonCodec.read(lobby[0])
+            latencies.append(time.perf_counter() - t)
+            await asyncio.sleep(LIST_INTERVAL)
+    prober = asyncio.create_task(probe())
+    t = time.perf_counter()
+    await asyncio.gather(*map(play, movers))
+    elapsed = time.perf_counter() - t
+    done.set()
+    await prober
+    return games*len(moves) / elapsed, sorted(latencies)
+
+def bench(games=8, moves=60, shards=max(2, os.cpu_count())):
+    print('{} {} games of {} moves at once, {} cores'.format(games, GAME, moves, os.cpu_count()))
+    print('{:<12}{:>10}{:>16}{:>16}'.format('games in', 'moves/s', 'list p50 (ms)', 'list max (ms)'))
+    sequence = legal_moves(moves)
+    for name, options in (('loop', {}), ('thread', {'threaded':True}), ('{} shards'.format(shards), {'shards':shards})):
+        port, stop = free_port(), multiprocessing.Event()
+        process = multiprocessing.Process(target=serve, args=(options, port, stop))
+        process.start()
+        time.sleep(2)
+        rate, latencies = asyncio.run(run(port, games, sequence))
+        stop.set()
+        process.join()
+        print('{:<12}{:>10.1f}{:>16.1f}{:>16.1f}'.format(name, rate, latencies[len(latencies)//2]*1000, latencies[-1]*1000))
+
+if __name__=="__main__":
+    bench(*map(int, sys.argv[1:]))
@@ -0,0 +1,40 @@
+# benchmark of SpatialIndex against scanning every piece, for boards with 50, 200, and 1000 pieces
+# usage: python benchmarks/spatial_index.py [piece counts ...]
+
+import sys, random, timeit
+from continuousEngine.core.geometry import Point, SpatialIndex
+
+piece_rad = 1
+QUERIES = 200
+
+def random_pieces(n):
+    # n non-overlapping pieces of radius piece_rad, packed into a square with about half of it covered
+    side = (n * 2 * (2*piece_rad)**2)**.5
+    index = SpatialIndex(2*piece_rad)
+    while len(index) < n:
+        p = Point(random.uniform(0, side), random.uniform(0, side))
+        if not index.near(p, 2*piece_rad): index.insert(p)
+    return list(index), side
+
+def bench(counts=(50, 200, 1000)):
+    random.seed(0)
+    print('{:>7} {:<26}{:>12}{:>12}{:>10}'.format('pieces', 'operation', 'scan (us)', 'index (us)', 'speedup'))
+    for n in counts:
+        pieces, side = random_pieces(n)
+        index = SpatialIndex(2*piece_rad, pieces)
+        queries = [Point(random.uniform(0, side), random.uniform(0, side)) for _ in range(QUERIES)]
+        cases = [
+            ('radius query (6r)',       lambda: [[p for p in pieces if q>>p < (6*piece_rad)**2] for q in queries],
+                                        lambda: [index.near(q, 6*piece_rad) for q in queries]),
+            ('nearest',                 lambda: [min(pieces, key=q.__rshift__) for q in queries],
+                                        lambda: [index.nearest(q) for q in queries]),
+            # includes building the index
+            ('pairs within 4r',         lambda: {(p,q) for p in pieces for q in pieces if p != q and p>>q < (4*piece_rad)**2},
+                                        lambda: (lambda index: {(p,q) for p in pieces for q in index.near(p, 4*piece_rad) if p != q})(SpatialIndex(2*piece_rad, pieces))),
+        ]
+        for name, scan, indexed in cases:
+            times = [min(timeit.repeat(f, number=3, repeat=3)) / 3 * 10**6 for f in (scan, indexed)]
+            print('{:>7} {:<26}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(n, name, *times, times[0]/times[1]))
+
+if __name__=="__main__":
+    bench(*([list(map(int, sys.argv[1:]))] if sys.argv[1:] else []))
@@ -28,6 +28,9 @@ class Player:
     def _receive_move(self, move, state):
         if move["player"]!=self.team:
             send(self.server, {"action":"move", "move":move})
+    def _receive_delta(self, move, h, shared=None):
+        self._receive_move(move, None)
+        return True
     def make_move(self):
         while 1:
             msg = self.loop.run_until_complete(receive(self.server))
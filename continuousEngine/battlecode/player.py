@@ -4,18 +4,42 @@
 #   winner()
 #   next_turn()
 
+from continuousEngine.battlecode.shared import read_state
+
 class PlayerTemplate:
     def __init__(self, game, game_name, team, *args):
         self.game = game(*args, headless=True)
         self.team = team
+        # where the runner's state can be read, if it's only sending moves (see shared.py)
+        self.shared = None
     def _receive_state(self, state):
         self.game.load_state(state)
     def _receive_move(self, move, state):
         self.game.attemptMove(move)
         self.on_move(move, state)
+    # when the runner sends only moves instead of the whole state
+    # h is the hash of the state after the move, which is only sent every so often since working it out serializes the whole state,
+    # and shared is where the state after the move can be read
+    # if self.game doesn't match the hash, it's loaded from shared; returns False if there's nowhere to load it from, and then on_move waits for _resync
+    def _receive_delta(self, move, h, shared=None):
+        self.game.attemptMove(move)
+        self.shared = shared
+        if h is not None and self.game.state_hash() != h:
+            if not shared: return False
+            self.game.load_state(self.state())
+        self.on_move(move, None)
+        return True
+    def _resync(self, move, state):
+        self.game.load_state(state)
+        self.on_move(move, state)
     
+    # the runner's state after the last move, as on_move would get it if the runner sent it, and a new copy each time
+    # when the runner is only sending moves, this is read from the state it shares with every player, so it only costs anything for players that ask
+    state = lambda self: read_state(self.shared) if self.shared else self.game.save_state()
+
     def on_move(self, move, state):
         # each move updates self.game, and then calls this function
+        # state is None if the runner is only sending moves, in which case self.game is the whole state, and self.state() gets the runner's
         pass
     def make_move(self):
         # return the move you want to make
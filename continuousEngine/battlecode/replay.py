@@ -0,0 +1,100 @@
+# the replay format of saved battlecode games: one line of json per record, written as the game goes, so a game that's cut off still has everything up to there
+#   {"type", "players", "args", "state"}: the game's type, the player file of each team, the args it was made with, and its state before the first move
+#   {"move": move}: each move, in order, and every KEYFRAME_INTERVAL moves also "keyframe": the whole state after it
+#   {"end": {"ending", "winner", "timing"}, "moves": n, "index": [[move number, offset], ...]}: how the game ended, and where in the file each keyframe is
+# a reader can go to any move by loading the keyframe before it and replaying the moves from there, without reading the rest of the file
+# (saves from before this format were a single json object with the final state and the whole history, which watch can still show)
+
+import json
+
+KEYFRAME_INTERVAL = 50
+
+class ReplayWriter:
+    def __init__(self, file, name, game, player_files, args):
+        self.file = open(file, 'wb')
+        self.moves = 0
+        self.index = []
+        self.write({'type':name, 'players':dict(zip(game.teams, player_files)), 'args':args, 'state':game.save_state()})
+
+    def write(self, record):
+        self.file.write((json.dumps(record)+'\n').encode())
+        # flushed, so the game can be watched while it's being played
+        self.file.flush()
+
+    # records move, which game has just made
+    def move(self, move, game):
+        self.moves += 1
+        if self.moves % KEYFRAME_INTERVAL == 0:
+            self.index.append([self.moves, self.file.tell()])
+            self.write({'move':move, 'keyframe':game.save_state()})
+        else:
+            self.write({'move':move})
+
+    def end(self, ending, winner, timing=None):
+        self.write({'end':{'ending':ending, 'winner':winner, 'timing':timing}, 'moves':self.moves, 'index':self.index})
+
+    close = lambda self: self.file.close()
+    __enter__ = lambda self: self
+    __exit__ = lambda self, *_: self.close()
+
+# the last line of binary file f, or None if it's still being written
+def last_line(f):
+    f.seek(0, 2)
+    end = f.tell()
+    # the newline ending the last line doesn't count
+    chunk, line = 1024, b''
+    while end > 0:
+        start = max(0, end - chunk)
+        f.seek(start)
+        line = f.read(end - start) + line
+        if b'\n' in line.rstrip(b'\n'):
+            break
+        end, chunk = start, chunk*2
+    return line.rstrip(b'\n').rsplit(b'\n', 1)[-1] if line.endswith(b'\n') else None
+
+class Replay:
+    def __init__(self, file):
+        self.file = open(file, 'rb')
+        self.header = json.loads(self.file.readline())
+        # move number: (offset of the line after it, the state after it), for each keyframe found so far, and the start
+        self.keyframes = {0:(self.file.tell(), self.header['state'])}
+        # the offsets of keyframes not read yet, from the index at the end
+        self.index = {}
+        # the number of moves and how the game ended, once they're known
+        self.moves = self.end = None
+        trailer = json.loads(last_line(self.file) or '{}')
+        if 'end' in trailer:
+            self.end, self.moves, self.index = trailer['end'], trailer['moves'], dict(trailer['index'])
+        # how many moves have been read, and where the next one is
+        self.position, self.offset = 0, self.keyframes[0][0]
+
+    # the next move, or None if there isn't one (yet, if the game is still being written)
+    def step(self):
+        self.file.seek(self.offset)
+        line = self.file.readline()
+        if not line.endswith(b'\n'): return None
+        record = json.loads(line)
+        if 'end' in record:
+            self.end, self.moves = record['end'], record['moves']
+            return None
+        self.offset = self.file.tell()
+        self.position += 1
+        if 'keyframe' in record:
+            self.keyframes[self.position] = (self.offset, record['keyframe'])
+        return record['move']
+
+    # goes to just after move n (or as far as there is), returning the state to load and the moves to make after it to get there
+    def seek(self, n):
+        k = max(m for m in [*self.keyframes, *self.index] if m <= n)
+        if k not in self.keyframes:
+            # a keyframe from the index, which is read now
+            self.file.seek(self.index[k])
+            line = self.file.readline()
+            self.keyframes[k] = (self.index[k] + len(line), json.loads(line)['keyframe'])
+        self.position, (self.offset, state) = k, self.keyframes[k]
+        moves = []
+        while self.position < n and (move := self.step()) is not None:
+            moves.append(move)
+        return state, moves
+
+    close = lambda self: self.file.close()
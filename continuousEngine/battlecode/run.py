@@ -4,63 +4,102 @@
 #   winner()
 #   next_turn()
 
-import json, os, traceback
+# each player runs in a process of its own (see sandbox.py), limited by
+#   move_time, move_cpu: the wall clock and cpu seconds it can take for any one move (or anything else it's asked to do)
+#   game_time, game_cpu: the wall clock and cpu seconds it can take over the whole game
+# a player that goes over loses, with the game ending in an error caused by it
+# after each move, every player is sent the move and the state it sees, which is pickled once for all the players who see the same state
+# with deltas (only for games where every team sees the whole state), players are sent just the move instead, and the state is written once for all of them
+# to read if they need it (see shared.py); every HASH_EVERY moves they're also sent the state's hash, and a player whose copy of the game doesn't match it reads the state
+# games are saved as replays (see replay.py), with each move written as it's made
 
-def run(name, game_class, game_name, player_files, player_modules, file, max_turns=None, *args):
-    game = game_class(*args, headless=True)
+import os, pickle, traceback
+from continuousEngine.battlecode.sandbox import PlayerProcess
+from continuousEngine.battlecode.shared import SharedState
+from continuousEngine.battlecode.replay import ReplayWriter
+from continuousEngine.network.server import public_state, view
+
+# hashing the state serializes all of it, in the runner and in every player, so it's only checked every so often
+HASH_EVERY = 10
+
+# plays a game to the end with a player from each of player_modules, and returns how it ended, who won, who caused the error if it ended with one, and how long the players took
+# each move is recorded in replay, if there is one
+def play(game, game_class, game_name, player_modules, max_turns=None, *args, replay=None, deltas=False, move_time=None, game_time=None, move_cpu=None, game_cpu=None):
     players = {}
+    # the team, wall clock seconds and cpu seconds of each move
+    moves = []
+    deltas = deltas and public_state(game_class)
+    shared = SharedState() if deltas else None
 
     try:
         for m, t in zip(player_modules, game.teams):
             try:
-                players[t] = m.Player(game_class, game_name, t, *args)
+                players[t] = PlayerProcess(m, game_class, game_name, t, *args, move_time=move_time, game_time=game_time, move_cpu=move_cpu, game_cpu=game_cpu)
                 players[t]._receive_state(game.get_state(t))
             except:
                 traceback.print_exc()
-                raise ValueError(game.next_turn(t))
+                raise ValueError(game.next_turn(t), t)
 
         while not game.is_over():
             try:
                 move = players[game.turn].make_move()
+                moves.append([game.turn, *players[game.turn].timing[-1][1:]])
             except:
                 traceback.print_exc()
-                raise ValueError(game.next_turn())
+                raise ValueError(game.next_turn(), game.turn)
 
             if not game.attemptMove(move):
                 print(f"{game.turn} attempted illegal move: {move}")
-                raise ValueError(game.next_turn())
+                raise ValueError(game.next_turn(), game.turn)
+            if replay:
+                replay.move(move, game)
 
+            # what's sent to each view, pickled when the first player with that view needs it
+            method = '_receive_delta' if deltas else '_receive_move'
+            messages = {None:pickle.dumps((method, (move, game.state_hash() if len(moves) % HASH_EVERY == 0 else None, shared.write(game.get_state(game.turn)))))} if deltas else {}
+            sent = {}
+            for t in players:
+                v = view(game_class, t)
+                if v not in messages:
+                    messages[v] = pickle.dumps((method, (move, game.get_state(t))))
+                sent[t] = players[t].send(messages[v])
+            # the players take in the move all at once, and then each is waited for
             for t in players:
                 try:
-                    players[t]._receive_move(move, game.get_state(t))
+                    if not players[t].wait(method, sent[t]) and deltas:
+                        players[t]._resync(move, game.get_state(t))
                 except:
                     traceback.print_exc()
-                    raise ValueError(game.next_turn(t))
+                    raise ValueError(game.next_turn(t), t)
             if max_turns and len(game.history)>=max_turns:
                 raise TypeError()
+        ending, winner, culprit = 'standard', game.winner(), None
     except ValueError as e:
-        ending = 'error'
-        winner = e.args[0]
+        ending, winner, culprit = 'error', e.args[0], e.args[1]
     except TypeError:
-        ending = 'draw'
-        winner = 'draw'
         traceback.print_exc()
-    else:
-        ending = 'standard'
-        winner = game.winner()
-
+        ending, winner, culprit = 'draw', 'draw', None
     finally:
-        if not os.path.exists("saves"):
-            os.mkdir("saves")
+        for p in players.values():
+            p.close()
+        if shared:
+            shared.close()
+    timing = {
+        'moves':moves,
+        # everything each player took, including taking in the state and moves
+        'totals':{t:{'wall':sum(w for _, w, _ in p.timing), 'cpu':sum(c for _, _, c in p.timing), 'calls':len(p.timing)} for t, p in players.items()},
+    }
+    return ending, winner, culprit, timing
+
+# a replay to write file to, made in saves if it doesn't exist
+def replay_file(file, name, game, player_files, args):
+    if not os.path.exists("saves"):
+        os.mkdir("saves")
+    return ReplayWriter(file, name, game, player_files, args)
 
-        with open(file,'w') as f:
-            f.write(json.dumps({
-                'type':name,
-                'players':dict(zip(game.teams, player_files)),
-                'ending':ending,
-                'winner':winner,
-                'state':game.save_state(),
-                'history':game.history,
-                'args':args,
-            }))
-        print("saved as {}".format(file))
+def run(name, game_class, game_name, player_files, player_modules, file, max_turns=None, *args, **options):
+    game = game_class(*args, headless=True)
+    with replay_file(file, name, game, player_files, args) as replay:
+        ending, winner, _, timing = play(game, game_class, game_name, player_modules, max_turns, *args, replay=replay, **options)
+        replay.end(ending, winner, timing)
+    print("saved as {}".format(file))
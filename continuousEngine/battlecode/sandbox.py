@@ -0,0 +1,110 @@
+# runs a player in a process of its own, so the runner can stop it when it takes too long
+# PlayerProcess has the same methods the runner uses on a player (_receive_state, _receive_move, _receive_delta, _resync, make_move), which are sent to the process and run there
+# every call is limited by the player's budgets:
+#   move_time, move_cpu: the wall clock time and cpu time any one call can take, in seconds
+#   game_time, game_cpu: the wall clock time and cpu time all of its calls together can take
+# a call that goes over raises OverBudget (killing the process if it's still going), which the runner treats like any error by the player
+# wall clock budgets are enforced by the runner, which stops waiting when they run out, and cpu budgets by the player's process itself (see serve)
+# the time each call took is kept in timing
+
+import os, time, signal, pickle, traceback, importlib, multiprocessing
+
+class OverBudget(Exception):
+    pass
+
+# the exit code of a player's process that ran out of cpu time
+OUT_OF_CPU = 86
+
+# runs in the player's process: makes the player, then does what's sent to it, sending back the result and how much wall clock and cpu time it took
+# while it works, a timer counting the process's cpu time (where there is one) stops it as soon as it goes over its cpu budgets, even if it never returns
+def serve(connection, module_name, game_class, game_name, team, args, move_cpu, game_cpu):
+    timed = hasattr(signal, 'setitimer') and (move_cpu is not None or game_cpu is not None)
+    if timed:
+        signal.signal(signal.SIGPROF, lambda *_: os._exit(OUT_OF_CPU))
+    used = 0
+    def run(f, *args):
+        nonlocal used
+        if timed:
+            signal.setitimer(signal.ITIMER_PROF, max(1e-6, min(b for b in (move_cpu, game_cpu if game_cpu is None else game_cpu-used) if b is not None)))
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            status, result = 'ok', f(*args)
+        except:
+            traceback.print_exc()
+            status, result = 'error', None
+        if timed:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        wall, cpu = time.perf_counter()-wall, time.process_time()-cpu
+        used += cpu
+        return status, result, wall, cpu
+
+    status, player, wall, cpu = run(lambda: importlib.import_module(module_name).Player(game_class, game_name, team, *args))
+    connection.send((status, None, wall, cpu))
+    if status == 'error': return
+    while True:
+        try:
+            method, call_args = connection.recv()
+        except EOFError:
+            # the runner is gone
+            return
+        connection.send(run(getattr(player, method), *call_args))
+
+class PlayerProcess:
+    def __init__(self, module, game_class, game_name, team, *args, move_time=None, game_time=None, move_cpu=None, game_cpu=None):
+        self.team = team
+        self.move_time, self.move_cpu = move_time, move_cpu
+        self.time_left, self.cpu_left = game_time, game_cpu
+        # (method, wall time, cpu time) for each call, including making the player
+        self.timing = []
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, args=(child, module.__name__, game_class, game_name, team, args, move_cpu, game_cpu))
+        start = time.perf_counter()
+        self.process.start()
+        child.close()
+        self.wait('__init__', start)
+
+    call = lambda self, method, *args: self.call_pickled(method, pickle.dumps((method, args)))
+
+    # makes a call that's already pickled, so a call to many players with the same arguments (like the same state) is only pickled once
+    call_pickled = lambda self, method, message: self.wait(method, self.send(message))
+
+    # starts a pickled call without waiting for it to finish, so many players can work at once, and returns when it was sent
+    def send(self, message):
+        start = time.perf_counter()
+        self.connection.send_bytes(message)
+        return start
+
+    # the result of the call to method sent at start, once it's finished
+    # the player times the call itself, so time spent waiting on other players isn't counted against it
+    def wait(self, method, start):
+        limits = [t for t in (self.move_time, self.time_left) if t is not None]
+        if not self.connection.poll(max(0, min(limits) - (time.perf_counter()-start)) if limits else None):
+            self.close()
+            raise OverBudget('{} took longer than {} seconds in {}'.format(self.team, min(limits), method))
+        try:
+            status, result, wall, cpu = self.connection.recv()
+        except EOFError:
+            self.close()
+            if self.process.exitcode == OUT_OF_CPU:
+                raise OverBudget('{} used too much cpu time in {}'.format(self.team, method))
+            raise RuntimeError('{} stopped in {}'.format(self.team, method))
+        self.timing.append((method, wall, cpu))
+        if self.time_left is not None: self.time_left -= wall
+        if self.cpu_left is not None: self.cpu_left -= cpu
+        if self.move_cpu is not None and cpu > self.move_cpu or self.cpu_left is not None and self.cpu_left < 0:
+            self.close()
+            raise OverBudget('{} used too much cpu time in {}'.format(self.team, method))
+        if status == 'error':
+            raise RuntimeError('{} raised an exception in {} (see above)'.format(self.team, method))
+        return result
+
+    _receive_state = lambda self, state: self.call('_receive_state', state)
+    _receive_move = lambda self, move, state: self.call('_receive_move', move, state)
+    _receive_delta = lambda self, move, h, shared=None: self.call('_receive_delta', move, h, shared)
+    _resync = lambda self, move, state: self.call('_resync', move, state)
+    make_move = lambda self: self.call('make_move')
+
+    def close(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
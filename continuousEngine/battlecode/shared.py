@@ -0,0 +1,26 @@
+# the runner's state after each move, written once where every player (each in a process of its own) can read it, rather than sent to each of them
+# players that are only sent moves read it only when they need it: to get back in step when their copy of the game stops matching, or when they ask for the whole state
+# each read unpickles a copy of the player's own, so no player can change what the others see
+# the runner only writes between calls to the players, so what a player reads during a call is the state after the last move it was sent
+
+import os, pickle, shutil, tempfile
+
+class SharedState:
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='continuous-state-')
+        self.path = os.path.join(self.directory, 'state')
+
+    # writes state as the latest, and returns where the players can read it
+    def write(self, state):
+        temp = self.path + '.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(temp, self.path)
+        return self.path
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def read_state(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,200 @@
+# runs many games between many players, as many at once as there are processes, and ranks the players
+# pairings are
+#   round-robin: every group of players the game has seats for plays once in each rotation of the seats, every round
+#   swiss (for two player games): each round, players are paired with others with the same score (or close), who they haven't played yet if possible
+# each game is played in a process of its own, with its own seed, so a game that takes too long can be stopped and everything can be repeated
+# players run in processes of their own under the game's (see run.py), with the options (deltas and budgets) given to tournament, and a player that goes over its budgets loses
+# players are rated by Elo and by TrueSkill (with the two player update, applied to every pair in games with more players)
+
+import os, sys, time, signal, random, itertools, importlib, multiprocessing, multiprocessing.connection, traceback, contextlib
+from statistics import NormalDist
+import continuousEngine
+from continuousEngine.battlecode.run import play, replay_file
+
+ELO_START, ELO_K = 1500, 32
+# TrueSkill's usual parameters
+MU, SIGMA = 25, 25/3
+BETA, TAU, DRAW_PROBABILITY = SIGMA/2, SIGMA/100, .1
+normal = NormalDist()
+DRAW_MARGIN = normal.inv_cdf((DRAW_PROBABILITY+1)/2) * 2**.5 * BETA
+
+# plays one game in a worker process, and sends back how it ended
+def play_game(connection, game_name, player_files, seed, max_turns, args, options, file, verbose):
+    # the game and its players' processes get a process group of their own, so they can all be stopped together
+    if hasattr(os, 'setpgrp'): os.setpgrp()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if verbose else devnull), contextlib.redirect_stderr(sys.stderr if verbose else devnull):
+            random.seed(seed)
+            game_class = continuousEngine.game_class(game_name)
+            game = game_class(*args, headless=True)
+            with replay_file(file, game_name, game, player_files, args) if file else contextlib.nullcontext() as replay:
+                ending, winner, culprit, timing = play(game, game_class, game_name, list(map(importlib.import_module, player_files)), max_turns, *args, replay=replay, **options)
+                if replay: replay.end(ending, winner, timing)
+        connection.send((ending, winner, culprit, len(game.history), dict(zip(game.teams, player_files))))
+    except:
+        # the game itself failed, which isn't any player's fault
+        connection.send(('crash', None, None, 0, {}))
+        traceback.print_exc()
+
+# plays games (lists of player files, in seat order) with up to processes at once, and returns their results in the same order
+# a game still going after timeout seconds is stopped, and ends in a timeout
+def play_games(games, game_name, processes, seeds, timeout, max_turns, args, options, save_as, verbose):
+    results, running, waiting = [None]*len(games), {}, list(enumerate(games))[::-1]
+    try:
+        while waiting or running:
+            while waiting and len(running) < processes:
+                i, files = waiting.pop()
+                receiver, sender = multiprocessing.Pipe(False)
+                # not a daemon, since daemons can't start the players' processes
+                process = multiprocessing.Process(target=play_game, args=(sender, game_name, files, seeds[i], max_turns, args, options, save_as(i, files), verbose))
+                process.start()
+                sender.close()
+                running[i] = (process, receiver, time.monotonic())
+            for ready in multiprocessing.connection.wait([r for _, r, _ in running.values()], timeout=.1):
+                i = next(j for j, (_, r, _) in running.items() if r is ready)
+                process, receiver, _ = running.pop(i)
+                try:
+                    results[i] = receiver.recv()
+                except EOFError:
+                    # the process died without saying how the game ended
+                    results[i] = ('crash', None, None, 0, {})
+                process.join()
+            for i, (process, receiver, started) in list(running.items()):
+                if timeout and time.monotonic() - started > timeout:
+                    stop(process)
+                    del running[i]
+                    results[i] = ('timeout', None, None, 0, {})
+            if verbose:
+                print('{}/{} games played'.format(len(games) - len(waiting) - len(running), len(games)), flush=True)
+    finally:
+        # nothing is left running if the tournament is interrupted
+        for process, _, _ in running.values():
+            stop(process)
+    return results
+
+# stops a game's process along with its players'
+def stop(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        # no process groups here (or the game's process hadn't made its own yet)
+        process.kill()
+    process.join()
+
+class Standings:
+    def __init__(self, players):
+        self.table = {p:{"games":0, "wins":0, "draws":0, "losses":0, "errors":0, "timeouts":0, "score":0} for p in players}
+        self.elo = {p:ELO_START for p in players}
+        self.trueskill = {p:(MU, SIGMA) for p in players}
+        # who has played who, and how often each has sat first, for swiss pairings
+        self.played = {p:set() for p in players}
+        self.first = {p:0 for p in players}
+        # games that failed on their own, which count for nobody
+        self.crashes = 0
+
+    # files is the players in seat order, and result is what play_game sent back
+    def record(self, files, result):
+        ending, winner, culprit, turns, teams = result
+        self.first[files[0]] += 1
+        for p in files:
+            self.played[p].update(q for q in files if q != p)
+        if ending == 'crash':
+            self.crashes += 1
+            return
+        for p in files:
+            self.table[p]["games"] += 1
+        if ending == 'timeout':
+            for p in files:
+                self.table[p]["timeouts"] += 1
+            return
+        if ending == 'error' and culprit in teams:
+            self.table[teams[culprit]]["errors"] += 1
+        if winner in teams:
+            for p in files:
+                self.table[p]["wins" if p == teams[winner] else "losses"] += 1
+            self.table[teams[winner]]["score"] += 1
+            for p in files:
+                if p != teams[winner]: self.rate(teams[winner], p, False)
+        else:
+            for p in files:
+                self.table[p]["draws"] += 1
+                self.table[p]["score"] += 1/len(files)
+            for p, q in itertools.combinations(files, 2):
+                self.rate(p, q, True)
+
+    # updates the ratings of p and q after p beat q, or they drew
+    def rate(self, p, q, draw):
+        expected = 1 / (1 + 10**((self.elo[q] - self.elo[p])/400))
+        change = ELO_K * ((.5 if draw else 1) - expected)
+        self.elo[p] += change
+        self.elo[q] -= change
+
+        (mu1, sigma1), (mu2, sigma2) = self.trueskill[p], self.trueskill[q]
+        var1, var2 = sigma1**2 + TAU**2, sigma2**2 + TAU**2
+        c = (2*BETA**2 + var1 + var2)**.5
+        t, e = (mu1 - mu2)/c, DRAW_MARGIN/c
+        if draw:
+            denominator = normal.cdf(e-t) - normal.cdf(-e-t)
+            v = (normal.pdf(-e-t) - normal.pdf(e-t)) / denominator
+            w = v**2 + ((e-t)*normal.pdf(e-t) + (e+t)*normal.pdf(e+t)) / denominator
+        else:
+            v = normal.pdf(t-e) / normal.cdf(t-e)
+            w = v * (v+t-e)
+        self.trueskill[p] = (mu1 + var1/c*v, (var1 * (1 - var1/c**2*w))**.5)
+        self.trueskill[q] = (mu2 - var2/c*v, (var2 * (1 - var2/c**2*w))**.5)
+
+    # the players, best first: by score, then by how sure TrueSkill is that they're good
+    ranking = lambda self: sorted(self.table, key=lambda p: (-self.table[p]["score"], -(self.trueskill[p][0] - 3*self.trueskill[p][1])))
+
+    def print(self):
+        print('{:<4}{:<24}{:>6}{:>6}{:>7}{:>8}{:>8}{:>10}{:>7}{:>7}{:>12}'.format('', 'player', 'games', 'wins', 'draws', 'losses', 'errors', 'timeouts', 'score', 'Elo', 'TrueSkill'))
+        for rank, p in enumerate(self.ranking(), 1):
+            row = self.table[p]
+            print('{:<4}{:<24}{:>6}{:>6}{:>7}{:>8}{:>8}{:>10}{:>7.1f}{:>7.0f}{:>12}'.format(rank, p, row["games"], row["wins"], row["draws"], row["losses"], row["errors"], row["timeouts"], row["score"], self.elo[p],
+                '{:.1f}±{:.1f}'.format(*self.trueskill[p])))
+        if self.crashes:
+            print('{} games failed without any player being at fault'.format(self.crashes))
+
+# every group of seats players, in every rotation
+round_robin = lambda players, seats: [group[k:]+group[:k] for group in itertools.combinations(players, seats) for k in range(seats)]
+
+def swiss_round(standings, players, rng):
+    # players with the same score are shuffled, so who plays who isn't decided by the order they were listed
+    order = sorted(players, key=lambda p: (-standings.table[p]["score"], rng.random()))
+    pairs = []
+    while len(order) > 1:
+        p = order.pop(0)
+        # the best placed player p hasn't played yet, or the best placed one if p has played everyone
+        q = next((q for q in order if q not in standings.played[p]), order[0])
+        order.remove(q)
+        # whoever has sat first less often sits first
+        pairs.append([p, q] if standings.first[p] <= standings.first[q] else [q, p])
+    if order:
+        # a bye, worth a win
+        standings.table[order[0]]["score"] += 1
+    return pairs
+
+# options are deltas, move_time, game_time, move_cpu and game_cpu, as for play
+def tournament(game_name, player_files, pairing='round-robin', rounds=1, processes=None, seed=0, timeout=None, max_turns=None, args=(), save_games=False, verbose=False, **options):
+    # players are imported now, so a missing one is found before any games are played
+    for f in player_files: importlib.import_module(f)
+    seats = len(continuousEngine.game_class(game_name)(*args, headless=True).teams)
+    if pairing == 'swiss' and seats != 2:
+        raise ValueError('swiss pairings are only for two player games, and {} has {} players'.format(game_name, seats))
+    if len(player_files) < seats:
+        raise ValueError('{} needs {} players'.format(game_name, seats))
+    processes = processes or os.cpu_count()
+    rng = random.Random(seed)
+    standings = Standings(player_files)
+    played = 0
+    for r in range(rounds):
+        games = round_robin(player_files, seats) if pairing == 'round-robin' else swiss_round(standings, player_files, rng)
+        seeds = [rng.getrandbits(32) for _ in games]
+        save_as = lambda i, files: os.path.join("saves", "tournament-{}-{}-{}".format(seed, played+i, "-vs-".join(files))) if save_games else None
+        for files, result in zip(games, play_games(games, game_name, processes, seeds, timeout, max_turns, args, options, save_as, verbose)):
+            standings.record(files, result)
+        played += len(games)
+        if verbose:
+            print('round {} of {}'.format(r+1, rounds))
+            standings.print()
+    return standings
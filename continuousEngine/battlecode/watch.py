@@ -1,20 +1,44 @@
 def watch(file):
-    import json, importlib, pygame, continuousEngine
+    import pygame, continuousEngine
+    from continuousEngine.battlecode.replay import Replay
     pygame.init()
-    with open(file) as f:
-        info = json.loads(f.read())
+    replay = Replay(file)
+    info = replay.header
 
     name = info['type']
     game = continuousEngine.game_class(name)(*info['args'])
-    def _f(_=None):
-        game.future = [info['state']]+info['history'][:0:-1]
-        game.load_state(info['history'][0])
-    game.keyPress[game.keys.resetGame] = _f
-    _f()
-
-
+    attempt = game.attemptMove
     game.attemptMove = lambda _: False
 
+    if 'history' in info:
+        # a save from before replays, with every state in it
+        replay.end = {'ending':info['ending'], 'winner':info['winner']}
+        replay.moves = len(info['history'])
+        def _f(_=None):
+            game.future = [info['state']]+info['history'][:0:-1]
+            game.load_state(info['history'][0])
+        game.keyPress[game.keys.resetGame] = _f
+        _f()
+        over = lambda: not game.future
+    else:
+        # moves are read from the file as they're needed, going back by loading the keyframe before and replaying the moves from there
+        def seek(n):
+            state, moves = replay.seek(n)
+            game.load_state(state)
+            for m in moves: attempt(m)
+            game.prep_turn()
+        def step(_=None):
+            move = replay.step()
+            if move is not None:
+                attempt(move)
+                game.prep_turn()
+        game.keyPress[game.keys.resetGame] = lambda e: seek(0)
+        game.keyPress[game.keys.undo] = lambda e: seek(replay.position-1) if replay.position else None
+        game.keyPress[game.keys.redo] = step
+        game.keyPress[game.keys.fastForward] = lambda e: seek(float('inf'))
+        seek(0)
+        over = lambda: replay.end is not None and replay.position == replay.moves
+
     continuousEngine.GameInfo(game,
         lambda _: [
             ('file', file),
@@ -22,12 +46,15 @@ def watch(file):
             ('turn', game.turn),
             (None, None),
             *((t, info['players'][t]) for t in game.teams),
-            *([] if game.future else [('winner',info['winner']), ('ending',info['ending'])])
+            *([('winner',replay.end['winner']), ('ending',replay.end['ending'])] if over() else [])
         ]
     )
 
-    print(f'turns: {len(game.future)}')
-    print(f'winner: {info["winner"]}')
-    if info['ending'] == 'error': print('game ended in error')
+    if replay.end:
+        print(f'turns: {replay.moves}')
+        print(f'winner: {replay.end["winner"]}')
+        if replay.end['ending'] == 'error': print('game ended in error')
+    else:
+        print('game not over (yet)')
 
     game.run()
@@ -0,0 +1,121 @@
+# how fast each game's engine checks and makes moves, with nothing drawn
+# every game that has an example battlecode player (battlecode/example<game>player.py) plays games against itself with that player in every seat,
+# with each game seeded, so the same moves are made every time and results can be compared between versions
+# only the game's attemptMove is timed; the players choose their moves and keep their own copies of the game without being timed
+# reported for each game:
+#   moves/s: accepted moves per second of attemptMove
+#   p50, p99: attemptMove's latency, over every move tried (including illegal ones)
+#   peak memory: the most memory allocated while playing one more game, measured apart from the timing since measuring it slows everything down
+# results can be written as json, and compared with results written earlier
+
+import json, time, random, platform, importlib, importlib.util, tracemalloc, argparse
+import continuousEngine
+
+MAX_MOVES = 200
+
+# the games that can be benchmarked, which are the ones with an example player
+player_module = lambda name: 'continuousEngine.battlecode.example{}player'.format(name)
+bench_games = lambda: [name for name in continuousEngine.ALL_GAMES if importlib.util.find_spec(player_module(name))]
+
+# plays a game with seed, returning the time taken by each attemptMove, how many were accepted, and whether the game ended in a player's error
+def play(name, seed, max_moves, args):
+    random.seed(seed)
+    game_class = continuousEngine.game_class(name)
+    game = game_class(*args, headless=True)
+    Player = importlib.import_module(player_module(name)).Player
+    players = {t:Player(game_class, name, t, *args) for t in game.teams}
+    for t, p in players.items():
+        p._receive_state(game.get_state(t))
+    latencies, moves = [], 0
+    while not game.is_over() and moves < max_moves:
+        try:
+            move = players[game.turn].make_move()
+        except Exception:
+            # the example players don't always cope with every position
+            return latencies, moves, True
+        start = time.perf_counter()
+        accepted = game.attemptMove(move)
+        latencies.append(time.perf_counter() - start)
+        if not accepted:
+            # the example players only make legal moves, so this shouldn't happen, but if it does the game can't go on
+            return latencies, moves, True
+        moves += 1
+        for t, p in players.items():
+            p._receive_move(move, game.get_state(t))
+    return latencies, moves, False
+
+# the most memory allocated at once while playing a game, in bytes
+def peak_memory(name, seed, max_moves, args):
+    tracemalloc.start()
+    try:
+        play(name, seed, max_moves, args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+percentile = lambda ordered, p: ordered[min(len(ordered)-1, int(p/100*len(ordered)))] if ordered else None
+
+def bench_game(name, games=5, seed=0, max_moves=MAX_MOVES, args=()):
+    latencies, moves, errors = [], 0, 0
+    for i in range(games):
+        l, m, e = play(name, seed+i, max_moves, args)
+        latencies += l
+        moves += m
+        errors += e
+    latencies.sort()
+    return {
+        "games":games,
+        "moves":moves,
+        "errors":errors,
+        "moves_per_second":moves/sum(latencies) if moves else None,
+        "p50_ms":percentile(latencies, 50)*1000 if latencies else None,
+        "p99_ms":percentile(latencies, 99)*1000 if latencies else None,
+        "peak_memory_kb":peak_memory(name, seed, max_moves, args)/1024,
+    }
+
+def bench(names=None, games=5, seed=0, max_moves=MAX_MOVES):
+    return {
+        "seed":seed,
+        "max_moves":max_moves,
+        "python":platform.python_version(),
+        "platform":platform.platform(),
+        "time":time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "games":{name:bench_game(name, games, seed, max_moves) for name in names or bench_games()},
+    }
+
+# a number for the table, or - if there isn't one
+number = lambda x, format: '-' if x is None else format.format(x)
+
+def print_results(results, baseline=None):
+    print('{:<10}{:>7}{:>8}{:>8}{:>12}{:>10}{:>10}{:>14}{}'.format('game', 'games', 'moves', 'errors', 'moves/s', 'p50 (ms)', 'p99 (ms)', 'peak mem (KB)', '  vs baseline' if baseline else ''))
+    for name, r in results["games"].items():
+        old = baseline and baseline["games"].get(name)
+        change = '  {:+.1f}% moves/s'.format((r["moves_per_second"]/old["moves_per_second"]-1)*100) if old and old.get("moves_per_second") and r["moves_per_second"] else ''
+        print('{:<10}{:>7}{:>8}{:>8}{:>12}{:>10}{:>10}{:>14}{}'.format(name, r["games"], r["moves"], r["errors"], number(r["moves_per_second"], '{:.1f}'),
+            number(r["p50_ms"], '{:.3f}'), number(r["p99_ms"], '{:.3f}'), number(r["peak_memory_kb"], '{:.0f}'), change))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='continuous-bench')
+    parser.add_argument('-g', '--game', action='append', choices=bench_games(), help='a game to benchmark (default: all of them)')
+    parser.add_argument('-n', '--games', default=5, type=int, help='games played of each')
+    parser.add_argument('-s', '--seed', default=0, type=int)
+    parser.add_argument('-m', '--max_moves', default=MAX_MOVES, type=int, help='moves after which a game is stopped')
+    parser.add_argument('-o', '--output', default=None, help='file to write the results to as json, or - for stdout')
+    parser.add_argument('-c', '--compare', default=None, help='json file of earlier results to compare with')
+    args = parser.parse_args(argv)
+
+    results = bench(args.game, args.games, args.seed, args.max_moves)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    if args.output == '-':
+        print(json.dumps(results, indent=1))
+    else:
+        print_results(results, baseline)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(json.dumps(results, indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import sys, pygame, asyncio, threading, os, shutil, importlib, time, math
+import sys, pygame, asyncio, threading, os, shutil, importlib, time, math, json, hashlib
 from continuousEngine.core.geometry import *
 
 # current games, as {file: class_name}
@@ -63,6 +63,31 @@ class Game:
 
         pygame.display.set_caption(name)
 
+        # what was shown last frame, so render can skip frames where nothing changed and only send what did change to the display
+        # needRedraw means something may have changed: it's set by events, and by setting an attribute of a renderable or adding one; needFlip means the whole screen should be sent
+        # between those, only the renderables in ticking (whose GET attributes change with time, like a clock) can change, so they're all that's checked
+        self.needRedraw = True
+        self.needFlip = True
+        self.ticking = []
+        self.last_ticks = None
+        self.last_drawings = {}
+        # while an object renders, what it draws on the screen is collected here, as (rect, look) pairs (see drew)
+        self.drawn = None
+
+        # layers which are slow to draw and rarely change can be put in static_layers; they're drawn once into an offscreen surface,
+        # which is reused until the view, the window size, or the layer's objects change, an attribute of one of them is set, or there's any input besides moving the mouse
+        # (so their GET attributes shouldn't depend on anything else, like the mouse position)
+        self.static_layers = set()
+        # counts input besides moving the mouse, which might change anything
+        self.inputs = 0
+        # for each layer, how many times its objects' attributes have been set, or objects added
+        self.changes = {}
+        # frames rendered so far, and the current one while rendering (None otherwise)
+        self.frames = 0
+        self.frame = None
+        # for each static layer, (what it was drawn for, the surface, what each object drew)
+        self.baked = {}
+
         # objects are assigned to 'layers' which give rendering order
         self.layerlist = []
         self.layers = {}
@@ -114,9 +139,9 @@ class Game:
             self.keys.panRight      : lambda e: self.pan(-self.panDist,0),
             self.keys.resetView     : lambda e: self.reset_view(),
             self.keys.resetGame     : lambda e: (self.record_state(), self.reset_state(), self.prep_turn()),
-            self.keys.fastForward   : lambda e: (self.history.append(self.save_state()), self.history.extend(reversed(self.future)), self.future.clear(), self.load_state(self.history.pop()), self.prep_turn()),
-            self.keys.undo          : lambda e: (self.future.append(self.save_state()), self.load_state(self.history.pop()), self.prep_turn()) if self.history else None,
-            self.keys.redo          : lambda e: (self.history.append(self.save_state()), self.load_state(self.future.pop()), self.prep_turn()) if self.future else None,
+            self.keys.fastForward   : lambda e: (self.fast_forward(), self.prep_turn()),
+            self.keys.undo          : lambda e: (self.undo(), self.prep_turn()) if self.history else None,
+            self.keys.redo          : lambda e: (self.redo(), self.prep_turn()) if self.future else None,
             self.keys.printState    : lambda e: print(self.save_state()),
             self.keys.skipTurn      : lambda e: (setattr(self, 'turn', self.next_turn()), self.prep_turn()),
             self.keys.reloadState   : lambda e: (self.load_state(self.save_state()), self.prep_turn()),
@@ -137,12 +162,23 @@ class Game:
 
         self.cache = {}
         self.clearCache = lambda: setattr(self, 'cache', {})
+        # CachedImg keeps a token here for each key, replaced whenever the image is regenerated
+        self.generations = {}
 
         self.initialState = self.make_initial_state()
         self.history = []
         self.future = []
         self.record_state = lambda:(self.history.append(self.save_state()),setattr(self,'future',[]))
 
+        # delta history: a game that defines apply_delta and revert_delta can record each move with record_delta(change)
+        # instead of record_state(), and undo/redo then only touch what the move changed rather than reloading the whole board
+        # history and future can hold full states and Deltas mixed together, e.g. after a network client loads the server's history
+        # headless games keep full states, since their history gets saved and sent around as a list of states
+        self.delta_history = not headless and self.apply_delta is not None and self.revert_delta is not None
+        self.record_delta = lambda change: (self.history.append(Delta(change)),setattr(self,'future',[])) if self.delta_history else None
+        # every keyframe_interval moves, a Delta also keeps the full state after it, so fast_forward can jump there directly
+        self.record_keyframe = lambda: setattr(self.history[-1], 'keyframe', self.save_state()) if self.delta_history and self.history and isinstance(self.history[-1], Delta) and len(self.history) % self.keyframe_interval == 0 else None
+
         self.reset_state = lambda: (self.load_state(self.initialState))
 
 
@@ -167,8 +203,15 @@ class Game:
     save_state = lambda self: None # returns description of state
     load_state = lambda self, _: None # implements description of state
     get_state = lambda self, team: self.save_state() #returns state from point of view of team
+    # digest of the full state, which network clients compare against the server's after applying a move themselves
+    state_hash = lambda self: hashlib.sha1(json.dumps(self.save_state()).encode()).hexdigest()
     make_initial_state = lambda self: None # creates a fresh initial state (perhaps with randomness)
 
+    # optional, for delta history: apply_delta(change) redoes a move recorded with record_delta(change), and revert_delta(change) undoes it
+    apply_delta = None
+    revert_delta = None
+    keyframe_interval = 20
+
     # can be overwritten for games with weird turn orders
     next_turn = lambda self, turn=None: self.teams[(self.teams.index(turn or self.turn)+1) % len(self.teams)]
     
@@ -201,7 +244,13 @@ class Game:
         self.needViewChange = True
 
  
+    # a layer has changed (see changes), so the next frame has to be drawn
+    def changed(self, layer):
+        self.needRedraw = True
+        self.changes[layer] = self.changes.get(layer, 0) + 1
+
     def add(self, obj, layer=0):
+        self.changed(layer)
         if layer not in self.layerlist:
             self.layerlist.append(layer)
             self.layerlist.sort()
@@ -210,21 +259,72 @@ class Game:
             self.layers[layer].append(obj)
 
     def clearLayer(self, layer):
+        self.changed(layer)
         self.layers[layer] = []
         if layer not in self.layerlist:
             self.layerlist.append(layer)
             self.layerlist.sort()
 
     def handle(self, event):
+        if event.type != pygame.MOUSEMOTION: self.inputs += 1
         if event.type in self.handlers:
             self.handlers[event.type](event)
 
     def render(self):
+        # renderables' GET attributes are evaluated at most once while a frame is rendered
+        self.frames += 1
+        self.frame = self.frames
+        try:
+            self.render_frame()
+        finally:
+            self.frame = None
+
+    def render_frame(self):
+        # with no events and no attributes set, the only things that can change are the ticking renderables, so if none of them have, skip the frame
+        ticks = [obj.snapshot() for obj in self.ticking]
+        if not self.needRedraw and not differ(ticks, self.last_ticks): return
+        self.last_ticks = ticks
+
+        # otherwise draw everything on screen, noting what each object drew where, and only send the rects of objects that drew something different to the display
+        view = (self.x_min(), self.y_min(), self.x_max(), self.y_max())
+        drawings = {}
         for l in self.layerlist:
-            for obj in self.layers[l]:
-                if obj.visible:
-                    obj.render()
-        pygame.display.flip()
+            if l in self.static_layers:
+                self.render_static(l, view, drawings)
+            else:
+                self.render_layer(l, view, drawings)
+
+        if self.needFlip:
+            pygame.display.flip()
+        else:
+            pygame.display.update([rect for obj in drawings.keys() | self.last_drawings.keys() if drawings.get(obj) != self.last_drawings.get(obj) for rect, _ in drawings.get(obj, []) + self.last_drawings.get(obj, [])])
+        self.last_drawings = drawings
+        self.needRedraw = self.needFlip = False
+
+    # renders the objects of layer l which are on screen, adding what they draw to drawings
+    def render_layer(self, l, view, drawings):
+        for obj in self.layers[l]:
+            self.drawn = []
+            if obj.visible and overlapping(obj.bbox(), view):
+                obj.render()
+            drawings[obj] = self.drawn
+        self.drawn = None
+
+    def render_static(self, l, view, drawings):
+        key = (self.scale, self.x_offset, self.y_offset, self.size(), self.inputs, tuple(self.layers[l]), self.changes.get(l, 0))
+        if l not in self.baked or differ(key, self.baked[l][0]):
+            # draw the layer onto a surface filled with the color key, so everything it doesn't draw on is transparent
+            surf = pygame.Surface(self.size()).convert(self.screen)
+            surf.fill(STATIC_COLORKEY)
+            layer_drawings = {}
+            self.screen, screen = surf, self.screen
+            self.render_layer(l, view, layer_drawings)
+            self.screen = screen
+            surf.set_colorkey(STATIC_COLORKEY, pygame.RLEACCEL)
+            self.baked[l] = (key, surf, layer_drawings)
+        _, surf, layer_drawings = self.baked[l]
+        self.screen.blit(surf, (0,0))
+        drawings.update(layer_drawings)
 
     def update(self):
         #print("in thread {}".format(threading.currentThread().getName()),flush=True)
@@ -232,6 +332,7 @@ class Game:
         event = pygame.event.wait(timeout=50)
         self.needViewChange = False
         self.needResize = False
+        self.needRedraw |= bool(event)
         while event:
             self.handle(event)
             event = pygame.event.poll()
@@ -239,7 +340,10 @@ class Game:
             self.resize()
         if self.needViewChange:
             self.viewChange()
-        self.process()
+            self.needFlip = True
+        # nothing to recompute if nothing happened
+        if self.needRedraw:
+            self.process()
         self.render()
 
     def attemptMove(self, move):
@@ -251,8 +355,75 @@ class Game:
 
         self.turn = self.next_turn()
         self.prep_turn()
+        self.record_keyframe()
         return True
 
+    # history holds what undo goes back to, future what redo goes forward to; an entry is either a full state or a Delta
+    def undo(self):
+        entry = self.history.pop()
+        if isinstance(entry, Delta):
+            self.revert_delta(entry.change)
+            self.future.append(entry)
+        else:
+            self.future.append(self.save_state())
+            self.load_state(entry)
+
+    def redo(self):
+        entry = self.future.pop()
+        if isinstance(entry, Delta):
+            self.apply_delta(entry.change)
+            self.history.append(entry)
+        else:
+            self.history.append(self.save_state())
+            self.load_state(entry)
+
+    def fast_forward(self):
+        if self.future and not any(isinstance(entry, Delta) for entry in self.future):
+            # only full states: jump straight to the last one
+            self.history.append(self.save_state())
+            self.history.extend(reversed(self.future))
+            self.future.clear()
+            self.load_state(self.history.pop())
+            return
+        # the last keyframe in the future, if every entry from there back to now is a Delta, lets us skip redoing the moves before it
+        last = next((i for i, entry in enumerate(self.future) if isinstance(entry, Delta) and entry.keyframe is not None), None)
+        if last is not None and all(isinstance(entry, Delta) for entry in self.future[last:]):
+            self.history.extend(reversed(self.future[last:]))
+            self.load_state(self.future[last].keyframe)
+            del self.future[last:]
+        while self.future:
+            self.redo()
+
+# static layers are transparent wherever they're this color, so it shouldn't be drawn in them
+STATIC_COLORKEY = (255, 0, 254)
+
+# do two boxes (x_min, y_min, x_max, y_max) overlap? no box (None) might overlap anything
+overlapping = lambda box1, box2: box1 is None or box2 is None or (box1[0] <= box2[2] and box2[0] <= box1[2] and box1[1] <= box2[3] and box2[1] <= box1[3])
+# the box (x_min, y_min, x_max, y_max) containing ps, grown by margin on each side
+box_around = lambda ps, margin=0: (lambda xs, ys: (min(xs)-margin, min(ys)-margin, max(xs)+margin, max(ys)+margin))([p[0] for p in ps], [p[1] for p in ps])
+
+# are two snapshots of renderables different? values that can't be compared (like numpy arrays) count as different
+def differ(snapshot1, snapshot2):
+    try:
+        return bool(snapshot1 != snapshot2)
+    except (ValueError, TypeError):
+        return True
+
+# records that something was drawn on the screen in rect (in pixels), so Game.render can tell when that changes and update just that part of the display
+# look is anything else that determines what was drawn there (colors, points, a surface, ...); returns rect
+# the draw functions here call this themselves, but a render method that draws on the screen with pygame directly needs to call it too
+def drew(game, rect, look=None, surface=None):
+    if game.drawn is not None and (surface is None or surface is game.screen):
+        game.drawn.append((rect, look))
+    return rect
+
+class Delta:
+    # a history entry recording a move by what it changed; keyframe is None or the full state after the move
+    def __init__(self, change, keyframe=None):
+        self.change = change
+        self.keyframe = keyframe
+    __repr__ = lambda self: "Delta({}{})".format(self.change, '' if self.keyframe is None else ', keyframe')
+
 def drawCircle(game, color, center, radius, width=0, realWidth=False, realRadius=True, surface=None, borderGrowth=1):
     # draws a circle with given center and radius
     # if width is given, draws the boundary; if width is 0, fills the circle
@@ -263,7 +434,7 @@ def drawCircle(game, color, center, radius, width=0, realWidth=False, realRadius
     if realWidth: width *= game.scale
     if realRadius: radius *= game.scale
 
-    pygame.draw.circle(surface, color, game.pixel(center), int(radius+width*borderGrowth), int(width))
+    drew(game, pygame.draw.circle(surface, color, game.pixel(center), int(radius+width*borderGrowth), int(width)), (color, int(width)), surface)
 
 def drawArc(game, color, center, radius, start_angle, stop_angle, width=3, realWidth=False, realRadius=True, surface=None, borderGrowth=1):
     if surface == None: surface = game.screen
@@ -273,7 +444,7 @@ def drawArc(game, color, center, radius, start_angle, stop_angle, width=3, realW
     radius = int(radius + width*borderGrowth)
     x,y = game.pixel(center)
     rect = pygame.Rect(x-radius, y-radius, 2*radius, 2*radius)
-    pygame.draw.arc(surface, color, rect, -stop_angle, -start_angle, width) # negative because coordinate system is flipped
+    drew(game, pygame.draw.arc(surface, color, rect, -stop_angle, -start_angle, width), (color, rect, start_angle, stop_angle, width), surface) # negative because coordinate system is flipped
 
 def drawPolygon(game, color, ps, width=0, realWidth=False, surface=None):
     # draws a polygon with vertices ps
@@ -289,7 +460,8 @@ def drawPolygon(game, color, ps, width=0, realWidth=False, surface=None):
         for asp in [(0,1,game.x_min()), (0,-1,game.x_max()),(1,1,game.y_min()), (1,-1,game.y_max())]:
             ps = intersection_polygon_halfplane(ps, *asp)
         if len(ps) >= 3:
-            pygame.draw.polygon(surface, color, [game.pixel(p) for p in ps])
+            pixels = [game.pixel(p) for p in ps]
+            drew(game, pygame.draw.polygon(surface, color, pixels), (color, pixels), surface)
 
 def drawSegment(game, color, p1, p2, width=3, realWidth=False, surface=None, caps=(True,True)):
     # draws a line with ends capped by circles, better than pygame.draw.line
@@ -312,31 +484,75 @@ def drawRay(game, color, loc, dir, width=2, realWidth=False, surface=None):
 
 class Renderable:
     # this modifies setting and getting attributes to be more convenient
-    # attributes are saved in self._dict as functions which take a game and give the value
-    # usually (when an attribute is constant) this wrapping and unwrapping is done automatically
     # you can use 'obj.x = y' and 'obj.x' as normal
     # but this also provides the feature that you can set a custom function using 'obj.GETx = f'
     # then 'obj.x' will return f(obj.game)
     # this makes it easier to put code which tells an object to change based on game state inside the object
     # this is probably terrible practice, but I don't really care, and I don't know a 'better' way to implement this
-    __setattr__ = lambda self, k, v: self._dict.__setitem__(k[3:], v) if k[:3]=='GET' else self._dict.__setitem__(k, lambda game: v)
-    __getattr__ = lambda self, k: self._dict[k](self.game)
+    # constant attributes are stored as usual, so reading them is as fast as for any object, and functions set with GET are saved in self._get
+    # while the game is rendering a frame, each function is only called once, and its value is remembered in self._memo for the rest of the frame
+    # setting an attribute (except while rendering) tells the game its layer changed, so the next frame is drawn
+    def __setattr__(self, k, v):
+        d = self.__dict__
+        if k[:3]=='GET':
+            d.pop(k[3:], None)
+            d['_get'][k[3:]] = v
+        else:
+            d['_get'].pop(k, None)
+            d[k] = v
+        if d['game'].frame is None:
+            d['game'].changed(d['_layer'])
+    def __getattr__(self, k):
+        # only called for attributes that aren't stored as usual
+        d = self.__dict__
+        if k not in d.get('_get', ()): raise AttributeError(k)
+        game = d['game']
+        if game.frame is None: return d['_get'][k](game)
+        memo = d['_memo'].get(k)
+        if memo is None or memo[0] != game.frame:
+            memo = d['_memo'][k] = (game.frame, d['_get'][k](game))
+        return memo[1]
     def __init__(self, game, layer):
         # creating a renderable adds it to the game
         # This might also be terrible practice, but it's more convenient than saying 'add' every time
         game.add(self, layer)
         self.__dict__['game'] = game
-        self.__dict__['_dict'] = {}
+        self.__dict__['_layer'] = layer
+        self.__dict__['_get'] = {}
+        self.__dict__['_memo'] = {}
         self.visible = True
     def render(self):
         pass
+    # a box (x_min, y_min, x_max, y_max) in game space containing everything render draws, so it can be skipped when that's off screen
+    # None means it could be anywhere, and it's always rendered
+    def bbox(self):
+        return None
+    # the current values of all its attributes (or just False if it's invisible), which Game.render compares between frames for ticking renderables
+    # values are frozen, so changing a list (or Point) in place still counts as a change
+    def snapshot(self):
+        return tuple((k, frozen(v)) for k, v in self.__dict__.items() if k not in ('game', '_layer', '_get', '_memo')) + tuple((k, frozen(evaluate(self, k))) for k in self._get) if self.visible else False
+
+# a copy of v that won't change when v does: lists, dicts, sets and Points in it are turned into tuples (recursively)
+def frozen(v):
+    if isinstance(v, (list, tuple)): return tuple(map(frozen, v))
+    if isinstance(v, dict): return tuple((k, frozen(x)) for k, x in v.items())
+    if isinstance(v, (set, frozenset)): return frozenset(map(frozen, v))
+    if isinstance(v, Point): return (Point, v.x, v.y)
+    return v
+
+# an attribute that can't be evaluated right now (say, it depends on a selected piece and none is selected) is snapshotted as its exception's type
+def evaluate(obj, k):
+    try:
+        return getattr(obj, k)
+    except Exception as e:
+        return type(e)
 
 class Background(Renderable):
     def __init__(self, game, color):
         super().__init__(game, -10**10)
         self.color = color
     def render(self):
-        self.game.screen.fill(self.color)
+        drew(self.game, self.game.screen.fill(self.color), self.color)
 
 class Segment(Renderable):
     def __init__(self, game, layer, color, p1, p2, width=3, realWidth=False):
@@ -344,6 +560,8 @@ class Segment(Renderable):
         self.color, self.p1, self.p2, self.width, self.realWidth = color, p1, p2, width, realWidth
     def render(self):
         drawSegment(self.game, self.color, self.p1, self.p2, self.width, self.realWidth)
+    def bbox(self):
+        return box_around([self.p1, self.p2], (self.width if self.realWidth else self.width/self.game.scale)/2 + 1/self.game.scale)
 
 class Line(Renderable):
     def __init__(self, game, layer, color, p1, p2, width=3):
@@ -354,7 +572,8 @@ class Line(Renderable):
         x2,y2 = self.p2
         dx, dy = x2-x1, y2-y1
         intersections = ({(u,y2-dy*(x2-u)/dx) for u in (self.game.x_min(),self.game.x_max())} if dx else set()) | ({(x2-dx*(y2-v)/dy,v) for v in (self.game.y_min(),self.game.y_max())} if dy else set())
-        pygame.draw.line(self.game.screen, self.color, self.game.pixel(Point(*max(intersections))), self.game.pixel(Point(*min(intersections))), int(self.width))
+        ends = self.game.pixel(Point(*max(intersections))), self.game.pixel(Point(*min(intersections)))
+        drew(self.game, pygame.draw.line(self.game.screen, self.color, *ends, int(self.width)), (self.color, ends, int(self.width)))
 
 class Grid(Renderable):
     # nx by ny grid of sizex by sizey rectangles starting at x,y
@@ -365,10 +584,11 @@ class Grid(Renderable):
         if sizey==None: sizey=sizex
         self.color, self.loc, self.nx, self.ny, self.sizex, self.sizey = color, loc, nx, ny, sizex, sizey
     def render(self):
-        for i in range(self.ny+1):
-            pygame.draw.line(self.game.screen, self.color, self.game.pixel((self.loc+Point(0,self.sizey*i))), self.game.pixel((self.loc+Point(self.sizex*self.nx,self.sizey*i))))
-        for i in range(self.nx+1):
-            pygame.draw.line(self.game.screen, self.color, self.game.pixel((self.loc+Point(self.sizex*i,0))), self.game.pixel((self.loc+Point(self.sizex*i,self.sizey*self.ny))))
+        for ends in [(self.game.pixel((self.loc+Point(0,self.sizey*i))), self.game.pixel((self.loc+Point(self.sizex*self.nx,self.sizey*i)))) for i in range(self.ny+1)] + \
+                    [(self.game.pixel((self.loc+Point(self.sizex*i,0))), self.game.pixel((self.loc+Point(self.sizex*i,self.sizey*self.ny)))) for i in range(self.nx+1)]:
+            drew(self.game, pygame.draw.line(self.game.screen, self.color, *ends), (self.color, ends))
+    def bbox(self):
+        return box_around([self.loc, self.loc+Point(self.sizex*self.nx, self.sizey*self.ny)], 1/self.game.scale)
 
 class InfiniteGrid(Renderable):
     # infinite grid of sizex by sizey rectangles offset by x,y
@@ -378,10 +598,9 @@ class InfiniteGrid(Renderable):
         if sizey==None: sizey=sizex
         self.color, self.sizex, self.sizey, self.loc = color, sizex, sizey, loc
     def render(self):
-        for i in range( int((self.game.x_min()-self.loc.x)/self.sizex) , int((self.game.x_max()-self.loc.x)/self.sizex)+1 ):
-            pygame.draw.line(self.game.screen, self.color, self.game.pixel(Point(self.loc.x+i*self.sizex,self.game.y_min())), self.game.pixel(Point(self.loc.x+i*self.sizex,self.game.y_max())))
-        for i in range( int((self.game.y_min()-self.loc.y)/self.sizey) , int((self.game.y_max()-self.loc.y)/self.sizey)+1 ):
-            pygame.draw.line(self.game.screen, self.color, self.game.pixel(Point(self.game.x_min(),self.loc.y+i*self.sizey)), self.game.pixel(Point(self.game.x_max(),self.loc.y+i*self.sizey)))
+        for ends in [(self.game.pixel(Point(self.loc.x+i*self.sizex,self.game.y_min())), self.game.pixel(Point(self.loc.x+i*self.sizex,self.game.y_max()))) for i in range( int((self.game.x_min()-self.loc.x)/self.sizex) , int((self.game.x_max()-self.loc.x)/self.sizex)+1 )] + \
+                    [(self.game.pixel(Point(self.game.x_min(),self.loc.y+i*self.sizey)), self.game.pixel(Point(self.game.x_max(),self.loc.y+i*self.sizey))) for i in range( int((self.game.y_min()-self.loc.y)/self.sizey) , int((self.game.y_max()-self.loc.y)/self.sizey)+1 )]:
+            drew(self.game, pygame.draw.line(self.game.screen, self.color, *ends), (self.color, ends))
 
 class CachedImg(Renderable):
     # gen(key) creates image which is saved at self.game.cache[key]
@@ -392,15 +611,21 @@ class CachedImg(Renderable):
     def render(self):
         if self.key not in self.game.cache:
             self.game.cache[self.key] = self.gen(self.key)
+            # gen might redraw and return the same surface, so each generation gets a new token to tell Game.render it's different
+            self.game.generations[self.key] = object()
         surf = self.game.cache[self.key]
         if self.loc:
             px,py = self.game.pixel(self.loc)
             if -surf.get_width() <= px <= self.game.width()+surf.get_width() and -surf.get_height() <= py <= self.game.height()+surf.get_height():
                 shiftx = {'l':0,'c':surf.get_width()//2,'r':surf.get_width()}[self.halign]
                 shifty = {'t':0,'c':surf.get_height()//2,'b':surf.get_height()}[self.valign]
-                self.game.screen.blit(surf, (px-shiftx, py-shifty))
+                drew(self.game, self.game.screen.blit(surf, (px-shiftx, py-shifty)), (surf, self.game.generations[self.key]))
         else:
-            self.game.screen.blit(surf, (0,0))
+            drew(self.game, self.game.screen.blit(surf, (0,0)), (surf, self.game.generations[self.key]))
+    def bbox(self):
+        # until the image is generated, we don't know its size
+        if not self.loc or self.key not in self.game.cache: return None
+        return box_around([self.loc], max(self.game.cache[self.key].get_size())/self.game.scale)
 
 
 class Text(Renderable):
@@ -409,7 +634,7 @@ class Text(Renderable):
         super().__init__(game, layer)
         self.font, self.text, self.loc, self.color, self.halign, self.valign = font, text, loc, color, halign, valign
     def render(self):
-        write(self.game.screen, self.font, self.text, *self.game.pixel(self.loc), self.color, self.halign, self.valign)
+        drew(self.game, write(self.game.screen, self.font, self.text, *self.game.pixel(self.loc), self.color, self.halign, self.valign), (str(self.text), self.color))
 
 class FixedText(Renderable):
     # text centered at pixel (x,y); fixed on screen. doesn't move with zoom/pan
@@ -417,14 +642,16 @@ class FixedText(Renderable):
         super().__init__(game, layer)
         self.font, self.text, self.x, self.y, self.color, self.kwargs = font, text, x, y, color, kwargs
     def render(self):
-        write(self.game.screen, self.font, self.text, self.x, self.y, self.color, **self.kwargs)
+        drew(self.game, write(self.game.screen, self.font, self.text, self.x, self.y, self.color, **self.kwargs), (str(self.text), self.color))
 
 class Rectangle(Renderable):
     def __init__(self, game, layer, color, loc, dx, dy):
         super().__init__(game, layer)
         self.color, self.loc, self.dx, self.dy = color, loc, dx, dy
     def render(self):
-        pygame.draw.rect(self.game.screen, self.color, pygame.Rect(*self.game.pixel(self.loc), int(self.dx*self.game.scale), int(self.dy*self.game.scale)))
+        drew(self.game, pygame.draw.rect(self.game.screen, self.color, pygame.Rect(*self.game.pixel(self.loc), int(self.dx*self.game.scale), int(self.dy*self.game.scale))), self.color)
+    def bbox(self):
+        return box_around([self.loc, self.loc+Point(self.dx, self.dy)], 1/self.game.scale)
 
 class Polygon(Renderable):
     def __init__(self, game, layer, color, points, width=3, realWidth=False):
@@ -432,6 +659,8 @@ class Polygon(Renderable):
         self.color, self.points, self.width, self.realWidth = color, points, width, realWidth
     def render(self):
         drawPolygon(self.game, self.color, self.points, self.width, self.realWidth)
+    def bbox(self):
+        return box_around(self.points, (self.width if self.realWidth else self.width/self.game.scale)/2 + 1/self.game.scale) if self.points else None
 
 class FilledPolygon(Polygon):
     def __init__(self, game, layer, color, points):
@@ -448,9 +677,11 @@ class PolygonIcon(Renderable):
     def render(self):
         x,y = self.game.pixel(self.loc)
         points = [(x+dx, y+dy) for dx,dy in self.offsets]
-        pygame.draw.polygon(self.game.screen, self.fill_color, points)
-        pygame.draw.lines(self.game.screen, self.border_color, True, points, width=self.line_width)
+        drew(self.game, pygame.draw.polygon(self.game.screen, self.fill_color, points), (self.fill_color, points))
+        drew(self.game, pygame.draw.lines(self.game.screen, self.border_color, True, points, width=self.line_width), (self.border_color, points, self.line_width))
         # todo: make this not look terrible when the lines are thick
+    def bbox(self):
+        return box_around([self.loc], (max(max(abs(dx), abs(dy)) for dx,dy in self.offsets) + self.line_width + 1)/self.game.scale)
 
 class Circle(Renderable):
     def __init__(self, game, layer, color, loc, r, width=3, **kwargs):
@@ -460,6 +691,10 @@ class Circle(Renderable):
         if color == None: color = self.color
         if width == None: width = self.width
         drawCircle(self.game, color, self.loc, self.r, width, **self.kwargs)
+    def bbox(self):
+        if self.loc is None: return None
+        scale = lambda real: 1 if real else 1/self.game.scale
+        return box_around([self.loc], self.r*scale(self.kwargs.get('realRadius', True)) + self.width*scale(self.kwargs.get('realWidth', False)) + 1/self.game.scale)
 
 class Disk(Circle):
     def __init__(self, *args, **kwargs):
@@ -479,7 +714,7 @@ class ScreenBorder(Renderable):
         super().__init__(game, layer)
         self.color, self.width = color, width
     def render(self):
-        pygame.draw.rect(self.game.screen, self.color, pygame.Rect((0,0), (self.game.width(), self.game.height())), self.width)
+        drew(self.game, pygame.draw.rect(self.game.screen, self.color, pygame.Rect((0,0), (self.game.width(), self.game.height())), self.width), (self.color, self.width))
 
 def write(screen, font, text, x, y, color, halign='c', valign='c', hborder='l', vborder='t'):
     # x and y are pixel values
@@ -510,7 +745,7 @@ def write(screen, font, text, x, y, color, halign='c', valign='c', hborder='l',
     vdic = {'t':0, 'c': 1/2, 'b': 1}
     shiftx = int(hdic[halign]*twidth - hdic[hborder]*swidth)
     shifty = int(vdic[valign]*theight - vdic[vborder]*sheight)
-    screen.blit(written, (int(x - hdic[halign]*twidth + hdic[hborder]*swidth), int(y - vdic[valign]*theight + vdic[vborder]*sheight)))
+    return screen.blit(written, (int(x - hdic[halign]*twidth + hdic[hborder]*swidth), int(y - vdic[valign]*theight + vdic[vborder]*sheight)))
 
 class GameInfo(Renderable):
     # vals should be a function with one argument that returns a list of pairs
@@ -529,7 +764,7 @@ class GameInfo(Renderable):
         hanchor = self.font_size * {'l':1, 'r':-1}[self.kwargs['hborder']]
         for i, (k, v) in {'t':identity, 'b':reversed}[self.kwargs['vborder']](list(enumerate(self.vals))):
             if k:
-                write(self.game.screen, self.font, f'{k}: {v}', hanchor, vanchor + delta*i, (0,0,0), **self.kwargs)
+                drew(self.game, write(self.game.screen, self.font, f'{k}: {v}', hanchor, vanchor + delta*i, (0,0,0), **self.kwargs), f'{k}: {v}')
 
 class TimerInfo(GameInfo):
     def __init__(self, game, timectrl):
@@ -537,6 +772,8 @@ class TimerInfo(GameInfo):
         super().__init__(game, val, 36, halign='r', valign='b', hborder='r', vborder='b')
         
         self.GETturn = lambda g: g.turn
+        # the times shown change by themselves
+        game.ticking.append(self)
         self.tc_initial, self.tc_increment = timectrl
         self.time_left = {}
         self.turn_started = None
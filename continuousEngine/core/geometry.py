@@ -1,40 +1,90 @@
-from math import atan2, pi, cos, sin
+from math import atan2, pi, cos, sin, floor
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional; it's only needed for PointArray
+    np = None
 # for debugging
 trace = lambda x, *y: (print(x), print(*y),x)[2]
 tracefn = lambda f: lambda *args: trace(f(*args), *args)
 
 class Point:
+    # x and y are slots, and the operators work on them directly (falling back to indexing for tuples)
+    # Points are created and combined in nearly every hot loop, so this avoids generators and extra tuples
+    __slots__ = ('x', 'y')
     def __init__(self, x, y, r=0, theta=0):
-        self.x = x + r * cos(theta)
-        self.y = y + r * sin(theta)
-        self.coords = (self.x,self.y)
-    __iter__ = lambda self: iter(self.coords)
-    __getitem__ = lambda self, v: self.coords[v]
-    __repr__ = lambda self: "Point{}".format(self.coords)
-    __eq__ = lambda self, other: isinstance(other, Point) and self.coords == other.coords
+        if r:
+            self.x = x + r * cos(theta)
+            self.y = y + r * sin(theta)
+        else:
+            # adding 0.0 keeps coordinates floats, as they are when the polar offset is added
+            self.x = x + 0.0
+            self.y = y + 0.0
+    coords = property(lambda self: (self.x, self.y))
+    __iter__ = lambda self: iter((self.x, self.y))
+    __getitem__ = lambda self, v: (self.x, self.y)[v]
+    __repr__ = lambda self: "Point{}".format((self.x, self.y))
+    __eq__ = lambda self, other: isinstance(other, Point) and self.x == other.x and self.y == other.y
     __ne__ = lambda self, other: not self == other
-    __hash__ = lambda self: hash(self.coords)
+    __hash__ = lambda self: hash((self.x, self.y))
     __bool__ = lambda self: True
     # adding, subtracting, and scaling vectors
-    __add__ = lambda p1, p2: Point(*(p1[i]+p2[i] for i in range(2)))
-    __sub__ = lambda p1, p2: Point(*(p1[i]-p2[i] for i in range(2)))
-    __mul__ = lambda p, c: Point(*(p[i]*c for i in range(2)))
-    __rmul__ = lambda p, c: Point(*(c*p[i] for i in range(2)))
-    __truediv__ = lambda p, c: Point(*(p[i]/c for i in range(2)))
+    __add__ = lambda p1, p2: Point(p1.x+p2.x, p1.y+p2.y) if isinstance(p2, Point) else Point(p1.x+p2[0], p1.y+p2[1])
+    __sub__ = lambda p1, p2: Point(p1.x-p2.x, p1.y-p2.y) if isinstance(p2, Point) else Point(p1.x-p2[0], p1.y-p2[1])
+    __mul__ = lambda p, c: Point(p.x*c, p.y*c)
+    __rmul__ = lambda p, c: Point(c*p.x, c*p.y)
+    __truediv__ = lambda p, c: Point(p.x/c, p.y/c)
     # +p: square length of p
-    __pos__ = lambda p: sum(x**2 for x in p)
+    __pos__ = lambda p: p.x**2 + p.y**2
     # p @ l: vector in the direction of p with length l
-    __matmul__ = lambda p, l: Point(*(l*x/(+p)**.5 for x in p)) if p != Point(0,0) else Point(0,0)
+    __matmul__ = lambda p, l: (lambda n: Point(l*p.x/n, l*p.y/n))((p.x**2 + p.y**2)**.5) if p.x or p.y else Point(0,0)
     # ~p: p rotated tau/4 clockwise
     __invert__ = lambda p: Point(p.y, -p.x)
     # p1 % p2: midpoint of p1 and p2
-    __mod__ = lambda p1, p2: (p1 + p2)/2
+    __mod__ = lambda p1, p2: Point((p1.x+p2.x)/2, (p1.y+p2.y)/2)
     # p1 ^ p2: determinant  of [p1 p2] (note: the coordinate system is left-handed, so this is negative what you might expect)
     __xor__ = lambda p1, p2: p1.x*p2.y - p1.y*p2.x
     # p1 >> p2: square distance from p1 to p2
-    __rshift__ = lambda p1, p2: +(p1-p2)
+    __rshift__ = lambda p1, p2: (p1.x-p2.x)**2 + (p1.y-p2.y)**2 if isinstance(p2, Point) else (p1.x-p2[0])**2 + (p1.y-p2[1])**2
     # p1 & p2: dot product of p1 and p2
-    __and__ = lambda p1, p2: sum(p1[i]*p2[i] for i in range(2))
+    __and__ = lambda p1, p2: p1.x*p2.x + p1.y*p2.y if isinstance(p2, Point) else p1.x*p2[0] + p1.y*p2[1]
+
+class PointArray:
+    # N points stored as an Nx2 float64 numpy array, for asking one question about many points at once
+    # the methods are vectorized versions of the functions below, with the points of the array as x
+    # each returns a numpy array with one entry per point, e.g. (pa >> p)[i] == pa[i] >> p
+    def __init__(self, points=()):
+        if np is None: raise ImportError('PointArray requires numpy')
+        self.array = np.array([(p[0], p[1]) for p in points], dtype=np.float64).reshape(-1, 2)
+    x = property(lambda self: self.array[:,0])
+    y = property(lambda self: self.array[:,1])
+    __len__ = lambda self: len(self.array)
+    __getitem__ = lambda self, i: Point(*self.array[i].tolist())
+    __iter__ = lambda self: (Point(x, y) for x, y in self.array.tolist())
+    __repr__ = lambda self: "PointArray({})".format(list(self))
+    def append(self, p):
+        self.array = np.append(self.array, [(p[0], p[1])], axis=0)
+    def delete(self, i):
+        self.array = np.delete(self.array, i, axis=0)
+
+    # pa >> p: square distances from each point to p
+    __rshift__ = lambda pa, p: (pa.x-p.x)**2 + (pa.y-p.y)**2
+    # is each point above the line p1-p2? (see above_line)
+    above_line = lambda pa, p1, p2: above_line_array(pa, p1, p2)
+    # signed distance of each point above the line p1-p2 (see dist_above_line)
+    # the arithmetic is done in the same order as dist_above_line, so the results are exactly the same
+    dist_above_line = lambda pa, p1, p2: ((pa.x-p1.x)*(p2.y-p1.y) - (pa.y-p1.y)*(p2.x-p1.x)) / (p1 >> p2)**.5 if p1 != p2 else (pa >> p1)**.5
+    # signed distance along the line p1-p2 of the projection of each point (see dist_along_line)
+    dist_along_line = lambda pa, p1, p2: (lambda d: (pa.x-p1.x)*d.x + (pa.y-p1.y)*d.y)((p2-p1) @ 1)
+    # distance of each point from the line p1-p2
+    dist_to_line = lambda pa, p1, p2: np.abs(pa.dist_above_line(p1, p2))
+    # distance of each point from the segment p1-p2 (see dist_to_segment)
+    dist_to_segment = lambda pa, p1, p2: (lambda along: np.where((0 < along) & (along < (p1>>p2)**.5), pa.dist_to_line(p1, p2), np.minimum(pa>>p1, pa>>p2)**.5))(pa.dist_along_line(p1, p2))
+    # does the segment from each point to the corresponding point of ends intersect the segment a-b? (see intersect_segments)
+    intersect_segments = lambda pa, ends, a, b: (above_line_array(a, b, pa) != above_line_array(a, b, ends)) & (above_line_array(a, ends, pa) != above_line_array(b, ends, pa))
+
+# above_line, where any of the arguments can be a PointArray (or anything else with x and y)
+above_line_array = lambda x, p1, p2: (p2.x-p1.x)*(x.y-p1.y) - (p2.y-p1.y)*(x.x-p1.x) < 0
 
 # area of polygon with vertices pts, counterclockwise
 polygon_area = lambda pts: sum(pts[i] ^ pts[(i+1)%len(pts)] for i in range(len(pts))) / 2
@@ -182,14 +232,79 @@ def intersect_polygon_circle_arcs(pts, p, r):
 
     return [(s, min(ends, key=lambda e: (e-s)%(2*pi))) for s in starts]
 
+class SpatialIndex:
+    # a uniform grid of square cells with side cell_size, for finding which items are near a point without looking at all of them
+    # loc(item) gives the Point an item is at; by default items are Points themselves
+    # an item's location is recorded when it's inserted, so call update(item) after moving it
+    # queries are fastest when cell_size is about the radius you usually query with
+    def __init__(self, cell_size, items=(), loc=lambda p: p):
+        self.cell_size, self.loc = cell_size, loc
+        # {cell: {item: None}}, so buckets remember insertion order and removal is fast
+        self.buckets = {}
+        # {item: cell}
+        self.cells = {}
+        for item in items: self.insert(item)
+
+    cell = lambda self, p: (floor(p.x/self.cell_size), floor(p.y/self.cell_size))
+    __len__ = lambda self: len(self.cells)
+    __iter__ = lambda self: iter(list(self.cells))
+    __contains__ = lambda self, item: item in self.cells
+
+    def insert(self, item):
+        if item in self.cells: self.remove(item)
+        c = self.cells[item] = self.cell(self.loc(item))
+        self.buckets.setdefault(c, {})[item] = None
+
+    def remove(self, item):
+        c = self.cells.pop(item)
+        del self.buckets[c][item]
+        if not self.buckets[c]: del self.buckets[c]
+
+    update = insert
+
+    def _box(self, x_min, y_min, x_max, y_max):
+        # items in cells which intersect the (closed) box
+        (i_min, j_min), (i_max, j_max) = self.cell(Point(x_min, y_min)), self.cell(Point(x_max, y_max))
+        if (i_max-i_min+1)*(j_max-j_min+1) > len(self.buckets):
+            # the box covers more cells than are occupied, so it's faster to check each occupied cell
+            return [item for (i,j), bucket in self.buckets.items() if i_min <= i <= i_max and j_min <= j <= j_max for item in bucket]
+        return [item for i in range(i_min, i_max+1) for j in range(j_min, j_max+1) for item in self.buckets.get((i,j), ())]
+
+    # items which might be within r of p; includes everything that is, and perhaps some others
+    candidates = lambda self, p, r: self._box(p.x-r, p.y-r, p.x+r, p.y+r)
+    # items which might be within r of the segment p1-p2; includes everything that is, and perhaps some others
+    candidates_segment = lambda self, p1, p2, r: self._box(min(p1.x,p2.x)-r, min(p1.y,p2.y)-r, max(p1.x,p2.x)+r, max(p1.y,p2.y)+r)
+    # items less than r from p
+    near = lambda self, p, r: [item for item in self.candidates(p, r) if p >> self.loc(item) < r**2]
+
+    def nearest(self, p, default=None):
+        # the item closest to p, or default if there are none
+        # searches rings of cells outward from p's cell; after ring k, anything unseen is at least k*cell_size away
+        i, j = self.cell(p)
+        best, best_dist = default, None
+        k = 0
+        while 8*k <= len(self.buckets):
+            ring = [(i+a, j+b) for a in range(-k, k+1) for b in ([-k, k] if abs(a) < k else range(-k, k+1))]
+            for c in ring:
+                for item in self.buckets.get(c, ()):
+                    d = p >> self.loc(item)
+                    if best_dist is None or d < best_dist:
+                        best, best_dist = item, d
+            if best_dist is not None and best_dist <= (k*self.cell_size)**2:
+                return best
+            k += 1
+        # the rings are getting bigger than the whole index, so check everything
+        return min(self.cells, key=lambda item: p >> self.loc(item), default=default)
+
 ## for computing voronoi diagrams
 ## by josh brunner
 def circumcenter(p1,p2,p3):
-    #rotate and sum helper function because you do it alot
-    f = lambda g:g(p1,p2,p3)+g(p2,p3,p1)+g(p3,p1,p2)
-    num = lambda i:f(lambda a,b,c: (a[1-i]-b[1-i])*a[1-i]*b[1-i] + a[1-i]*c[i]*c[i] - c[1-i]*a[i]*a[i])
-    denom = lambda i:f(lambda a,b,c: 2 * (a[i]*b[1-i] - a[i]*c[1-i]))
-    return Point(num(0)/denom(0), num(1)/denom(1))
+    #each coordinate is a sum over the three rotations of (p1,p2,p3); this is written out in full because it's called a lot
+    (x1,y1),(x2,y2),(x3,y3) = p1,p2,p3
+    num = lambda ax,ay,bx,by,cx,cy: (ay-by)*ay*by + ay*cx*cx - cy*ax*ax
+    denom = lambda ax,ay,bx,by,cx,cy: 2 * (ax*by - ax*cy)
+    return Point((num(x1,y1,x2,y2,x3,y3)+num(x2,y2,x3,y3,x1,y1)+num(x3,y3,x1,y1,x2,y2))/(denom(x1,y1,x2,y2,x3,y3)+denom(x2,y2,x3,y3,x1,y1)+denom(x3,y3,x1,y1,x2,y2)),
+                 (num(y1,x1,y2,x2,y3,x3)+num(y2,x2,y3,x3,y1,x1)+num(y3,x3,y1,x1,y2,x2))/(denom(y1,x1,y2,x2,y3,x3)+denom(y2,x2,y3,x3,y1,x1)+denom(y3,x3,y1,x1,y2,x2)))
 class Voronoi:
     def __init__(self, p1, p2):
         """
@@ -217,8 +332,44 @@ class Voronoi:
         inf_cd = Point(f(c,d,0),f(c,d,1))
         inf_da = Point(f(d,a,0),f(d,a,1))
         self.voronoi_vertices = {a:[lc,inf_da,inf_ab],b:[rc,lc,inf_ab,inf_bc],c:[rc,inf_bc,inf_cd],d:[lc,rc,inf_cd,inf_da]}
-    def nearest(self, p):
-        return min(self.points, key=lambda q:p>>q)
+        #the answer to the last call to nearest (or the last point added), where the next one starts by default
+        self.last_nearest = a
+    @classmethod
+    def from_points(cls, points, box):
+        """a voronoi diagram of points, with bounding box box (a pair of points, as for __init__).
+        This is much faster than adding the points one at a time in the order given, for many points:
+        it adds them in the order of a sweep back and forth across the box, so each one is close to the previous one and nearest only takes a few steps.
+        For points in general position the diagram is the same either way (though self.points is in the sweep's order).
+        With four or more points on a circle, or three on a line, what add does depends on the order the points come in, so the diagram can differ,
+        and add can fail on the sweep's order where it wouldn't on another."""
+        diagram = cls(*box)
+        if points:
+            (x1, y1), (x2, y2) = box
+            rows = max(1, int((len(points)/2)**.5))
+            height = (abs(y2-y1) or 1) / rows
+            row = lambda p: min(rows-1, max(0, floor((p[1]-min(y1,y2))/height)))
+            for p in sorted(points, key=lambda p: (row(p), p[0] * (-1)**row(p))):
+                diagram.add(p)
+        return diagram
+    #if True, nearest checks every point instead of walking the diagram. This is slow, but useful for checking the walk gives the same answers.
+    brute_force = False
+    def nearest(self, p, hint=None):
+        """the point of the diagram nearest to p.
+        Starting from hint (by default the previous answer), repeatedly move to a neighbor closer to p until none are.
+        The neighbors are a delaunay triangulation, which guarentees this ends at the nearest point; queries near the previous one take only a few steps."""
+        if self.brute_force:
+            return min(self.points, key=lambda q:p>>q)
+        q = hint if hint in self.contiguities else self.last_nearest if self.last_nearest in self.contiguities else self.points[0]
+        d = p>>q
+        moved = True
+        while moved:
+            moved = False
+            for r in self.contiguities[q]:
+                if r != "inf" and p>>r < d:
+                    q, d, moved = r, p>>r, True
+                    break
+        self.last_nearest = q
+        return q
     def add(self, p):
         """add a point to the voronoi diagram. The algorithm outline is at the top of the file."""
         self.contiguities[p] = []
@@ -226,19 +377,17 @@ class Voronoi:
         q_0 = self.nearest(p)
         q = q_0
         while True:
-            i = 0
             k = len(self.contiguities[q])
             #this is the range of indices of q's contiguities that should be removed due to the addition of p
             #this range is exclusive: we want to keep both endpoints of the range in q's contiguities
             d = [0,0]
-            while i<k:
-                r = self.voronoi_vertices[q][i%k]
-                i+=1
-                s = self.voronoi_vertices[q][i%k]
+            #for each of q's voronoi vertices, its distance along pq, as a fraction of |pq|, from p
+            dx, dy = p.x-q.x, p.y-q.y
+            dists = [(dx*(p.x-r.x) + dy*(p.y-r.y))/(dx**2+dy**2) for r in self.voronoi_vertices[q]]
+            for i in range(1,k+1):
+                r_dist, s_dist = dists[i-1], dists[i%k]
                 #the perpendicular bisector of pq crosses the segment rs in the r->s direction
                 #in otherwords, the unique adjacent pair r,s with the property that r is closer to q and s is closer to p
-                r_dist = ((p[0]-q[0])*(p[0]-r[0]) + (p[1]-q[1])*(p[1]-r[1]))/((p[0]-q[0])**2+(p[1]-q[1])**2)
-                s_dist = ((p[0]-q[0])*(p[0]-s[0]) + (p[1]-q[1])*(p[1]-s[1]))/((p[0]-q[0])**2+(p[1]-q[1])**2)
                 if  r_dist > .5 >= s_dist:
                     d[0] = i%k
                     self.contiguities[p].append(self.contiguities[q][i%k])
@@ -260,6 +409,8 @@ class Voronoi:
         l = self.contiguities[p]
         self.voronoi_vertices[p] = [circumcenter(p,l[i],l[(i+1)%len(l)]) for i in range(len(l))]
         self.points.append(p)
+        #the next point added is often close to this one, so start the next search here
+        self.last_nearest = p
     def remove(self,p):
         """remove a point from the diagram. The algorithm outline is at the top of the file."""
         l = self.contiguities[p]
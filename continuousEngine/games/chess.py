@@ -55,6 +55,7 @@ class Constants:
         KNIGHT: .30,
         PAWN:   .25,
     }
+    MAX_RADIUS = max(RADIUS.values())
 
 class Layers:
 #     0: background
@@ -76,9 +77,13 @@ class Piece(Renderable):
         self.GEToutline_color = lambda g: threatened_color if any(self in p.threatening for p in g.shown) or (g.active_piece and self in g.ghost.threatening) else {Constants.WHITE:white_outline_color,Constants.BLACK:black_outline_color}[self.color]
 
     def render(self, color=None):
-        pygame.draw.circle(self.game.screen, color or capture_color if self in self.game.capture else blocking_color if self in self.game.blocking else {Constants.WHITE:white_color,Constants.BLACK:black_color}[self.color], self.game.pixel(self.loc), int(self.r*self.game.scale))
-        pygame.draw.circle(self.game.screen, self.outline_color, self.game.pixel(self.loc), int(self.r*self.game.scale), 2)
-        self.game.screen.blit(self.sprite, (lambda x,y:(x-24,y-27))(*self.game.pixel(self.loc)))
+        fill_color = color or capture_color if self in self.game.capture else blocking_color if self in self.game.blocking else {Constants.WHITE:white_color,Constants.BLACK:black_color}[self.color]
+        drew(self.game, pygame.draw.circle(self.game.screen, fill_color, self.game.pixel(self.loc), int(self.r*self.game.scale)), fill_color)
+        drew(self.game, pygame.draw.circle(self.game.screen, self.outline_color, self.game.pixel(self.loc), int(self.r*self.game.scale), 2), self.outline_color)
+        drew(self.game, self.game.screen.blit(self.sprite, (lambda x,y:(x-24,y-27))(*self.game.pixel(self.loc))), self.sprite)
+
+    def bbox(self):
+        return box_around([self.loc], max(self.r, max(self.sprite.get_size())/self.game.scale))
 
     def update_threatening_cache(self, pieces):
         self.threatening_cache = self.capturable(pieces)
@@ -94,11 +99,12 @@ class Runner(Piece):
 
     def find_move(self, loc, pieces):
         # returns (Point move, [Piece] blocking, [Piece] capture)
+        # pieces is a SpatialIndex of the pieces on the board
 
         move = min((nearest_on_line(loc,self.loc,self.loc+p) for p in self.dirs), key = lambda p: p>>loc)
 
-        intersecting = {p for p in pieces if blocks_segment(self.loc, self.r, move, p)}
-        capture = {p for p in pieces if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
+        intersecting = {p for p in pieces.candidates_segment(self.loc, move, self.r+Constants.MAX_RADIUS) if blocks_segment(self.loc, self.r, move, p)}
+        capture = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
         blocking = intersecting - capture - {self}
 
         return move, blocking, capture
@@ -130,15 +136,16 @@ class Knight(Piece):
     def draw_guide(self, loc=None, color=guide_color, width=line_width, realWidth=False):
         loc = loc or self.loc
         width *= self.game.scale if realWidth else 1
-        pygame.draw.circle(self.game.screen, color, self.game.pixel(loc), int(self.game.scale*knight_dist+width/2), int(width))
+        drew(self.game, pygame.draw.circle(self.game.screen, color, self.game.pixel(loc), int(self.game.scale*knight_dist+width/2), int(width)), (color, int(width)))
 
     def find_move(self, loc, pieces):
         # returns (Point move, [Piece] blocking, [Piece] capture)
+        # pieces is a SpatialIndex of the pieces on the board
 
         move = nearest_on_circle(loc, self.loc, knight_dist)
 
-        capture = {p for p in pieces if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
-        blocking = {p for p in pieces if p.color == self.color and move>>p.loc < (self.r+p.r)**2}
+        capture = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
+        blocking = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color == self.color and move>>p.loc < (self.r+p.r)**2}
         
         return move, blocking, capture
 
@@ -164,12 +171,13 @@ class King(Piece):
 
     def find_move(self, loc, pieces):
         # returns (Point move, [Piece] blocking, [Piece] capture)
+        # pieces is a SpatialIndex of the pieces on the board
 
         move = min((nearest_on_segment(loc,self.loc+d1,self.loc+d2) for d1,d2 in king_deltas),
                 key = lambda p: p>>loc)
 
-        capture = {p for p in pieces if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
-        blocking = {p for p in pieces if p.color == self.color and move>>p.loc < (self.r+p.r)**2}
+        capture = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
+        blocking = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color == self.color and move>>p.loc < (self.r+p.r)**2}
         
         return move, blocking, capture
 
@@ -201,10 +209,11 @@ class Pawn(Piece):
 
     def find_move(self, loc, pieces):
         # returns (Point move, [Piece] blocking, [Piece] capture)
+        # pieces is a SpatialIndex of the pieces on the board
         move = min((nearest_on_segment(loc,self.loc,self.loc+p) for p in [Point(0,self.sign*(1+(self.loc.y==-2.5*self.sign))), Point(1,self.sign), Point(-1,self.sign)]), key = lambda p: p>>loc)
 
-        intersecting = {p for p in pieces if blocks_segment(self.loc, self.r, move, p)} - {self}
-        capture = {p for p in pieces if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
+        intersecting = {p for p in pieces.candidates_segment(self.loc, move, self.r+Constants.MAX_RADIUS) if blocks_segment(self.loc, self.r, move, p)} - {self}
+        capture = {p for p in pieces.candidates(move, self.r+Constants.MAX_RADIUS) if p.color != self.color and move>>p.loc < (self.r+p.r)**2}
 
         if move.x == self.loc.x:
             blocking = intersecting | capture
@@ -271,7 +280,7 @@ class Ghost(Renderable):
                 if threatened: pygame.draw.circle(self.surf, threatened_color, (size//2,size//2), diameter//2, 2)
                 self.surf.blit(self.game.active_piece.sprite, (size//2-25, size//2-25))
                 self.surf.fill((255, 255, 255, alpha), None, pygame.BLEND_RGBA_MULT)
-            self.game.screen.blit(self.surf,(lambda x,y:(x-self.surf.get_width()//2,y-self.surf.get_height()//2))(*self.game.pixel(self.loc)))
+            drew(self.game, self.game.screen.blit(self.surf,(lambda x,y:(x-self.surf.get_width()//2,y-self.surf.get_height()//2))(*self.game.pixel(self.loc))), self.surf)
 
 Constants.PIECE_CLASSES = {
         Constants.KING: King,
@@ -319,6 +328,8 @@ class Chess(Game):
         self.load_state = lambda state: (setattr(self, 'turn', state[0]), (lambda pieces: (
             self.clearLayer(Layers.PIECES),
             [Constants.PIECE_CLASSES[name](self,color,Point(*loc)) for name, color, loc in pieces],
+            # for finding pieces near a point or segment
+            setattr(self, 'index', SpatialIndex(1, self.layers[Layers.PIECES], loc=lambda p: p.loc)),
             self.clearLayer(Layers.SHOWN_PIECES),
             [Guide(self,Layers.SHOWN_PIECES,p,{Constants.WHITE:bg_white_guide_color, Constants.BLACK:bg_black_guide_color}[p.color]) for p in self.layers[Layers.PIECES]],
             setattr(self, 'active_piece', None),
@@ -331,6 +342,9 @@ class Chess(Game):
 
         self.process = lambda : self.updateMove()
 
+        # guides for middle-clicked pieces only change when something's moved or toggled
+        self.static_layers.add(Layers.SHOWN_PIECES)
+
         self.future_guide = Guide(self,Layers.FUTURE_MOVES,None, future_guide_color)
         self.future_guide.GETvisible = lambda game: self.active_piece != None
 
@@ -360,7 +374,7 @@ class Chess(Game):
     def updateMove(game, pos=None):
         pos = game.mousePos() if pos==None else Point(*pos)
         if game.active_piece:
-            move, game.blocking, game.capture = game.active_piece.find_move(pos, game.layers[Layers.PIECES])
+            move, game.blocking, game.capture = game.active_piece.find_move(pos, game.index)
             game.future_guide.loc = move
             game.ghost.loc = move
             for p in game.shown: 
@@ -376,7 +390,7 @@ class Chess(Game):
         """a move contains whose turn, a location that is being picked up, and a location that is being placed."""
         # print("attempting move \n"+str(move))
         selected_loc = Point(*move["selected"])
-        self.active_piece = next((p for p in self.layers[Layers.PIECES] if selected_loc>>p.loc < p.r**2), None)
+        self.active_piece = next((p for p in self.index.candidates(selected_loc, Constants.MAX_RADIUS) if selected_loc>>p.loc < p.r**2), None)
         if self.active_piece == None or not self.turn == move["player"] == self.active_piece.color:
             return False
         return attemptGameMove(self, move["location"])
@@ -391,12 +405,17 @@ def attemptGameMove(game, pos):
         game.shown = []
 
         game.active_piece.loc = game.ghost.loc
+        game.index.update(game.active_piece)
         for piece in game.capture:
             game.layers[Layers.PIECES].remove(piece)
+            game.index.remove(piece)
 
         if isinstance(game.active_piece, Pawn) and abs(game.active_piece.loc.y)>=3.5: # pawn promotes
-            Guide(game, Layers.SHOWN_PIECES, Queen(game, game.active_piece.color, game.active_piece.loc), {Constants.WHITE:bg_white_guide_color, Constants.BLACK:bg_black_guide_color}[game.active_piece.color])
+            queen = Queen(game, game.active_piece.color, game.active_piece.loc)
+            Guide(game, Layers.SHOWN_PIECES, queen, {Constants.WHITE:bg_white_guide_color, Constants.BLACK:bg_black_guide_color}[game.active_piece.color])
+            game.index.insert(queen)
             game.layers[Layers.PIECES].remove(game.active_piece)
+            game.index.remove(game.active_piece)
 
         game.active_piece = None
         game.updateMove()
@@ -404,7 +423,7 @@ def attemptGameMove(game, pos):
     return False
 
 def selectPiece(game, mouse_pos):
-    clicked_on = [p for p in game.layers[Layers.PIECES] if mouse_pos>>p.loc < p.r**2]
+    clicked_on = [p for p in game.index.candidates(mouse_pos, Constants.MAX_RADIUS) if mouse_pos>>p.loc < p.r**2]
     if len(clicked_on) > 1:
         raise ValueError('overlapping pieces: {}'.format(str(clicked_on)))
     elif clicked_on and clicked_on[0].color==game.turn:
@@ -420,7 +439,7 @@ def selectPiece(game, mouse_pos):
 
 
 def toggleShown(game, mouse_pos):
-    clicked_on = [p for p in game.layers[Layers.PIECES] if mouse_pos>>p.loc < p.r**2]
+    clicked_on = [p for p in game.index.candidates(mouse_pos, Constants.MAX_RADIUS) if mouse_pos>>p.loc < p.r**2]
     if len(clicked_on) > 1:
         raise ValueError('overlapping pieces: {}'.format(str(clicked_on)))
     elif clicked_on:
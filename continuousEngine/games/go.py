@@ -15,7 +15,8 @@ on_board = lambda p: +p < (board_rad - piece_rad)**2
 on_board_pt = lambda p: +p < board_rad**2
 # which pieces (among xs) are close enough to p1 and p2 to possibly get in the way?
 # those which intersect a circle at the same distance as p1 from p2; i.e. within max_dist_sq**.5 of p2 (and symmetrically of p1)
-chokepoints = lambda p1, p2, xs: (lambda max_dist_sq:{x for x in xs if p1>>x < max_dist_sq and p2>>x < max_dist_sq})(((p1>>p2)**0.5 + 2*piece_rad)**2)
+# xs can be a SpatialIndex, in which case only pieces near p1 are checked
+chokepoints = lambda p1, p2, xs: (lambda max_dist_sq:{x for x in (xs.candidates(p1, max_dist_sq**.5) if isinstance(xs, SpatialIndex) else xs) if p1>>x < max_dist_sq and p2>>x < max_dist_sq})(((p1>>p2)**0.5 + 2*piece_rad)**2)
 # separate chokepoints into those above and below the line; gives tuple of sets (above line, below line)
 split_chokepoints = lambda p1, p2, xs: (lambda cps: ({x for x in cps if above_line(p1,p2,x)},{x for x in cps if not above_line(p1,p2,x)}))(chokepoints(p1,p2,xs))
 # can you locally slide from p1 to p2, without touching pieces at xs?
@@ -25,7 +26,7 @@ split_chokepoints = lambda p1, p2, xs: (lambda cps: ({x for x in cps if above_li
 connected = lambda p1, p2, xs: (lambda tops, bots: not any(nearby(top,bot) and intersect_segments(p1,p2,top,bot) for top in tops for bot in bots)
                                                     and not any(intersect_segments(p1,p2,*cut) for cut in boundary_cuts(tops|bots)))(*split_chokepoints(p1,p2,xs))
 # given {p} pieces, give {(p1,p2)} of pairs of points within 4r
-weak_edges = lambda pieces: {(p1,p2) for p1 in pieces for p2 in pieces if p1 != p2 and nearby(p1,p2)}
+weak_edges = lambda pieces: (lambda index: {(p1,p2) for p1 in pieces for p2 in index.near(p1, 4*piece_rad) if p1 != p2})(piece_index(pieces))
 # given [p] pieces, give {(p1,b)} of lines to the boundary which might prevent movement (i.e. less than 3r)
 # it's fine for the line to extend past the boundary -- we double the coordinates for simplicity; this only works because board_rad is enough bigger than piece_rad
 boundary_cuts = lambda pieces: {(p, 2*p) for p in pieces if +p > (board_rad-3*piece_rad)**2}
@@ -45,6 +46,8 @@ nearby = lambda p1, p2: p1>>p2 < (4*piece_rad)**2
 sorta_nearby = lambda p1, p2: p1>>p2 < (6*piece_rad)**2
 # centers of circles tangent to both circles centered at p1 and p2
 double_tangents = lambda p1, p2: intersection_circles(p1, p2, 2*piece_rad)
+# SpatialIndex of piece locations, for finding the pieces nearby a point
+piece_index = lambda pieces: SpatialIndex(2*piece_rad, pieces)
 
 class Layers:
     TERRITORY   = 0.5
@@ -109,17 +112,14 @@ class Go(Game):
             self.clearLayer(Layers.GUIDES),
             self.add(self.nextPiece.guide, Layers.GUIDES),
             setattr(self.nextPiece.guide, 'visible', False),
-            setattr(self.voronoi, 'diagram', Voronoi((-board_rad, -board_rad), (board_rad, board_rad))),
             [self.clearLayer(Layers.PIECES[team]) for team in self.teams+['GHOST']],
-            [self.makePiece(team, Point(*p)) for team in self.teams for p in pieces[team]],
+            [GoPiece(self, team, Point(*p)) for team in self.teams for p in pieces[team]],
+            setattr(self.voronoi, 'diagram', Voronoi.from_points([pc.loc for team in self.teams for pc in self.layers[Layers.PIECES[team]]], ((-board_rad, -board_rad), (board_rad, board_rad)))),
             setattr(self, 'turn', turn),
             setattr(self, 'capturedCount', capCount.copy()),
             setattr(self, 'passes', passes),
             setattr(self, 'guides', set()),
-            self.updateLiberties(),
-            self.updateGraph(),
-            self.updateTerritory(),
-            self.clearCache()
+            self.updatePosition()
             ))(*x)
 
         self.allow_skip = True
@@ -136,10 +136,10 @@ class Go(Game):
         # make a piece on team t at (x,y)
         self.makePiece = lambda t,p: (GoPiece(self, t, p), self.voronoi.diagram.add(p))
 
-        # remove pieces at {(x,y)} ps
-        self.removePieces = lambda ps: (lambda pcs: [(
+        # remove pieces at {(x,y)} ps, counting them as captured unless captured is False
+        self.removePieces = lambda ps, captured=True: (lambda pcs: [(
             self.layers[Layers.PIECES[pc.team]].remove(pc), self.layers[Layers.GUIDES].remove(pc.guide),
-            self.capturedCount.__setitem__(pc.team, self.capturedCount[pc.team]+1),
+            self.capturedCount.__setitem__(pc.team, self.capturedCount[pc.team]+captured),
             self.voronoi.diagram.remove(pc.loc)
             ) for pc in pcs
             ])([pc for t in self.teams for pc in self.layers[Layers.PIECES[t]] if pc.loc in ps])
@@ -173,7 +173,8 @@ class Go(Game):
 
 
     def attemptGameMove(self, move):
-        self.record_state()
+        # with delta history, the move is recorded once we know what it changes
+        if not self.delta_history: self.record_state()
         self.clearLayer(Layers.PIECES['GHOST'])
 
         if move["action"] == "place":
@@ -181,19 +182,41 @@ class Go(Game):
             self.updateMove(pos)
             if self.blockers or not on_board(pos): return
             self.makePiece(self.turn, pos)
+            self.record_delta((self.turn, self.passes, pos.coords, {t:[p.loc.coords for p in self.layers[Layers.PIECES[t]] if p.loc in self.captures] for t in self.teams}))
             self.removePieces(self.captures)
             [setattr(p.guide, 'visible', False) for t in self.teams for p in self.layers[Layers.PIECES[t]]]
             self.nextPiece.guide.visible = False
-            self.updateLiberties()
-            self.updateGraph()
-            self.updateTerritory()
-            self.clearCache()
+            self.updatePosition()
             self.passes = 0
             return True
         elif move["action"] == "skip":
+            self.record_delta((self.turn, self.passes, None, {t:[] for t in self.teams}))
             self.passes += 1
             return True
 
+    # a move's change is (turn, passes before it, location placed or None for a skip, {team: locations captured})
+    def apply_delta(self, change):
+        turn, passes, placed, captured = change
+        self.clearLayer(Layers.PIECES['GHOST'])
+        if placed:
+            self.makePiece(turn, Point(*placed))
+            self.removePieces({Point(*p) for t in self.teams for p in captured[t]})
+            self.updatePosition()
+        self.passes = 0 if placed else passes+1
+        self.turn = self.next_turn(turn)
+
+    def revert_delta(self, change):
+        turn, passes, placed, captured = change
+        self.clearLayer(Layers.PIECES['GHOST'])
+        if placed:
+            # a piece captured as soon as it's placed is already gone
+            self.removePieces({Point(*placed)}, False)
+            [self.makePiece(t, Point(*p)) for t in self.teams for p in captured[t] if p != placed]
+            [self.capturedCount.__setitem__(t, self.capturedCount[t]-len(captured[t])) for t in self.teams]
+            self.updatePosition()
+        self.passes = passes
+        self.turn = turn
+
 
     def updateMove(self, pos=None):
         pos = pos or self.mousePos()
@@ -205,6 +228,8 @@ class Go(Game):
             new_pc_w_es = {(pos,p) for p in pieces[self.turn] if nearby(pos,p)}
             pieces[self.turn].add(pos)
             all_pieces = union(iter(pieces.values()))
+            indices = {t:piece_index(pieces[t]) for t in self.teams}
+            all_index = piece_index(all_pieces)
 
             # THE RULE: a piece is captured if there's no way to slide it continuously without bumping into opponent's pieces to an empty space
             # a 'liberty' is a location tangent to a piece which it can slide to, preventing capture
@@ -218,27 +243,29 @@ class Go(Game):
             opp_edges = filter_edges(self.edges[opp], new_pc_w_es | boundary_cuts({pos}))
 
             # the pieces in the opponent's components we might capture (i.e. those with a piece within 6r), in components according to the new graph
-            opp_cmps = components(union(cmp for cmp in self.components[opp] if any(sorta_nearby(pos, p) for p in cmp)), list(opp_edges))
+            opp_cmps = (lambda close: components(union(cmp for cmp in self.components[opp] if not cmp.isdisjoint(close)), list(opp_edges)))(set(indices[opp].near(pos, 6*piece_rad)))
 
             # an opponent's component is captured if...
             self.captures = union(cmp for cmp in opp_cmps if
                                     # it's not an isolated piece with nothing nearby...
-                                    any(nearby(p, other) for p in cmp for other in all_pieces if p != other)
+                                    any(p != other for p in cmp for other in all_index.near(p, 4*piece_rad))
                                     # and the new piece overlaps or blocks all the component's liberties...
-                                    and all(overlap(pos, lib) or not connected(p, lib, pieces[self.turn]) for p in cmp for lib in self.liberties[p])
+                                    and all(overlap(pos, lib) or not connected(p, lib, indices[self.turn]) for p in cmp for lib in self.liberties[p])
                                     # and none of the tangencies with the new piece are new liberties
-                                    and not any(on_board(tan) and not any(overlap(tan, p) for p in all_pieces) and connected(pc, tan, pieces[self.turn]) for pc in cmp for tan in double_tangents(pos,pc)))
+                                    and not any(on_board(tan) and not all_index.near(tan, 2*piece_rad) and connected(pc, tan, indices[self.turn]) for pc in cmp for tan in double_tangents(pos,pc)))
 
             # after any opponent pieces are captured...
             pieces[opp] -= self.captures
             all_pieces = union(iter(pieces.values()))
+            indices[opp] = piece_index(pieces[opp])
+            all_index = piece_index(all_pieces)
 
             # we figure out which of our pieces get captured
             # some new edges are introduced, in two ways:
             # 1. edges with the new piece
-            new_edges = filter_edges(new_pc_w_es, (lambda close_pcs: weak_edges(close_pcs) | boundary_cuts(close_pcs))({p for p in pieces[opp] if sorta_nearby(p, pos)}))
+            new_edges = filter_edges(new_pc_w_es, (lambda close_pcs: weak_edges(close_pcs) | boundary_cuts(close_pcs))(set(indices[opp].near(pos, 6*piece_rad))))
             # 2. edges which are de-broken by pieces being captured
-            near_capture = {p for p in pieces[self.turn] if any(nearby(p,cap) for cap in self.captures)}
+            near_capture = {p for cap in self.captures for p in indices[self.turn].near(cap, 4*piece_rad)}
             new_edges |= filter_edges({e for e in self.potentialEdges[self.turn] if set(e)<=near_capture}, {e for e in self.potentialEdges[opp] if self.captures.isdisjoint(e)} | boundary_cuts(pieces[opp]))
             # some components are merged by the new edges
             my_cmps = components(None, list(new_edges), self.components[self.turn]+[{pos}])
@@ -246,19 +273,22 @@ class Go(Game):
             # one of our components is captured if...
             self.captures |= union(cmp for cmp in my_cmps if
                                     # it's not an isolated piece with nothing nearby...
-                                    any(nearby(p, other) for p in cmp for other in all_pieces if p != other)
+                                    any(p != other for p in cmp for other in all_index.near(p, 4*piece_rad))
                                     # and the new piece overlaps all the component's liberties (it can't block movement because it's on the same team)...
                                     and all(overlap(pos, lib) for p in cmp-{pos} for lib in self.liberties[p])
                                     # and none of the tangencies with the new piece are new liberties for an existing piece...
-                                    and not any(on_board(tan) and not any(overlap(tan, p) for p in all_pieces) and connected(pc, tan, pieces[opp]) for pc in cmp for tan in double_tangents(pos,pc))
-                                    # and, if this is the component of the new piece, none of its tangencies with any piece are new liberties
-                                    and (pos not in cmp or not any(on_board(tan) and not any(overlap(tan, p) for p in all_pieces) and connected(pos, tan, pieces[opp]) for pc in all_pieces for tan in double_tangents(pos,pc))))
+                                    and not any(on_board(tan) and not all_index.near(tan, 2*piece_rad) and connected(pc, tan, indices[opp]) for pc in cmp for tan in double_tangents(pos,pc))
+                                    # and, if this is the component of the new piece, none of its tangencies with any piece are new liberties (only pieces within 4r have tangencies)
+                                    and (pos not in cmp or not any(on_board(tan) and not all_index.near(tan, 2*piece_rad) and connected(pos, tan, indices[opp]) for pc in all_index.candidates(pos, 4*piece_rad) for tan in double_tangents(pos,pc))))
 
         else: 
             self.blockers = set()
             self.captures = set()
 
-    updateLiberties = lambda self: setattr(self, 'liberties', {pc.loc: (lambda close_pcs, close_opps: {tan for pc2 in close_pcs for tan in double_tangents(pc.loc, pc2) if on_board(tan) and not any(overlap(tan, p) for p in close_pcs) and connected(pc.loc, tan, close_opps)})([pc2.loc for t2 in self.teams for pc2 in self.layers[Layers.PIECES[t2]] if pc2 != pc and sorta_nearby(pc2.loc,pc.loc)], [pc2.loc for pc2 in self.layers[Layers.PIECES[self.next_turn(t)]] if sorta_nearby(pc2.loc, pc.loc)]) for t in self.teams for pc in self.layers[Layers.PIECES[t]]})
+    updatePosition = lambda self: (self.updateLiberties(), self.updateGraph(), self.updateTerritory(), self.clearCache())
+
+    updateLiberties = lambda self: (lambda indices, all_index: setattr(self, 'liberties', {pc.loc: (lambda close_pcs, close_opps: {tan for pc2 in close_pcs for tan in double_tangents(pc.loc, pc2) if on_board(tan) and not any(overlap(tan, p) for p in close_pcs) and connected(pc.loc, tan, close_opps)})([pc2 for pc2 in all_index.near(pc.loc, 6*piece_rad) if pc2 != pc.loc], indices[self.next_turn(t)].near(pc.loc, 6*piece_rad)) for t in self.teams for pc in self.layers[Layers.PIECES[t]]})
+        )({t:piece_index(pc.loc for pc in self.layers[Layers.PIECES[t]]) for t in self.teams}, piece_index(pc.loc for t in self.teams for pc in self.layers[Layers.PIECES[t]]))
 
     def updateGraph(self):
         pieces = {t:[p.loc for p in self.layers[Layers.PIECES[t]]] for t in self.teams}
@@ -98,9 +98,7 @@ class JrapVoronoi(CachedImg):
         super().__init__(game, layer, 'voronoi', gen)
     def reset(self, cells):
         # cells is a list of ( point, color )
-        self.diagram = Voronoi(Point(board_rad, board_rad), Point(-board_rad, -board_rad))
-        
-        for p,_ in cells: self.diagram.add(p)
+        self.diagram = Voronoi.from_points([p for p,_ in cells], (Point(board_rad, board_rad), Point(-board_rad, -board_rad)))
 
         self.player = dict(cells)
 
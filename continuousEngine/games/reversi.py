@@ -1,4 +1,9 @@
 from continuousEngine import *
+try:
+    import numpy as np
+except ImportError:
+    # without numpy, pivots checks each piece one at a time
+    np = None
 
 # Note to anyone reading this code: sometimes p (or p1 or p2 or pt or pv) is a Point, and sometimes it's a ReversiPiece. I'm sorry.
 
@@ -54,20 +59,34 @@ on_line_tangents = lambda x, p1, p2: (lambda dist: (lambda dx: (x+dx, x-dx)) ((p
 # we save some time by only considering pieces close enough to the line to matter (i.e. within 3*piece_rad)
 # it's slowest when finding real pivots, since it has to check every potential location (and can be lazy when it fails to find a pivot)
 # there are pathological cases meaning you can't just look at pieces on the line or something clever like that
-pivots = lambda pcs, t, pt: [(pv,[pc for pc in pcs if core_in_path(pc.loc, pt, pv.loc)]) for pv in pcs
+# with numpy and at least ARRAY_PIECES pieces, 1-3 and finding the pieces close to the line are checked against every piece at once (see pivots_array)
+# (with fewer, making the array costs more than it saves)
+ARRAY_PIECES = 16
+pivots = lambda pcs, t, pt: pivots_array(list(pcs), t, pt) if np and len(pcs) >= ARRAY_PIECES else [(pv,[pc for pc in pcs if core_in_path(pc.loc, pt, pv.loc)]) for pv in pcs
             if pv.team==t # 1. pv is on your team
             and any(core_in_path(pc.loc, pt, pv.loc) for pc in pcs) # 2. there's a piece with core on the line
             and not any(pc.team == t and in_path(pc.loc, pt, pv.loc) for pc in pcs) # 3. no piece on your team intersects the line
-            # 4. you can't fit another piece on the line without overlap: try some potential locations for each piece near the line
-            and (lambda closePieces: 
+            # 4. you can't fit another piece on the line without overlap
+            and line_full(pt, pv, {p for p in pcs if dist_to_line(p.loc, pt, pv.loc) < 3*piece_rad})
+            ]
+# 4. for pieces at pt and pv, with closePieces near the line between them: try some potential locations for each piece near the line
+line_full = lambda pt, pv, closePieces: (
                 # 4.1. tangent to one piece, in the direction (parrallel|perpendicular) to the line
                 not any(on_board(p) and in_path(p, pt, pv.loc) and not any(overlap(p,q.loc) for q in closePieces) and not overlap(p,pt) for pc in closePieces for p in on_line_tangents(pc.loc, pt, pv.loc))
                 # 4.2. tangent to two existing pieces
                 and not any(in_path(p, pt, pv.loc) and not overlap(p,pt) for pc in closePieces for p in pc.valid_tangents)
                 # 4.3. tangent to existing piece and new piece
                 and not any(in_path(p, pt, pv.loc) and not any(overlap(p,q.loc) for q in closePieces) for pc in closePieces for p in double_tangents(pt,pc.loc))
-                ) ({p for p in pcs if dist_to_line(p.loc, pt, pv.loc) < 3*piece_rad})
-            ]
+                )
+# in_path (or core_in_path, with r=piece_core) for every point of pa at once
+in_path_array = lambda pa, p1, p2, r=piece_rad: (lambda along: (pa.dist_to_line(p1, p2) < r) & (epsilon < along) & (along < (p1>>p2)**.5 - epsilon))(pa.dist_along_line(p1, p2)) if p1 != p2 else np.zeros(len(pa), dtype=bool)
+# pivots, with the pieces' locations in a PointArray, so each check against every piece is one call rather than one per piece
+# PointArray does the same arithmetic as the functions it vectorizes, so this finds exactly the same pivots
+pivots_array = lambda pcs, t, pt: (lambda locs, mine: [(pv, [pcs[i] for i in np.flatnonzero(cores)]) for pv, cores in ((pv, in_path_array(locs, pt, pv.loc, piece_core)) for pv in pcs if pv.team==t)
+            if cores.any()
+            and not (mine & in_path_array(locs, pt, pv.loc)).any()
+            and line_full(pt, pv, {pcs[i] for i in np.flatnonzero(locs.dist_to_line(pt, pv.loc) < 3*piece_rad)})
+            ])(PointArray(pc.loc for pc in pcs), np.array([pc.team == t for pc in pcs], dtype=bool))
 
 class Layers:
     BOUNDARY    = 1
@@ -104,7 +123,7 @@ class ReversiPiece(BorderDisk):
         def render(self):
             super().render()
             for pt in self.valid_tangents:
-                pygame.draw.line(self.game.screen, Colors.debug, self.game.pixel(self.loc), self.game.pixel(pt), 3)
+                drew(self.game, pygame.draw.line(self.game.screen, Colors.debug, self.game.pixel(self.loc), self.game.pixel(pt), 3), (self.game.pixel(self.loc), self.game.pixel(pt)))
 
 class ReversiPieceCore(Disk):
     def __init__(self, game, piece, layer):
@@ -137,6 +156,7 @@ class Reversi(Game):
         self.save_state = lambda: (self.turn, [(p.team, p.loc.coords) for p in self.layers[Layers.PIECES]])
         self.load_state = lambda x: (lambda turn, pieces:(
             self.clearLayer(Layers.PIECES),
+            setattr(self, 'index', SpatialIndex(2*piece_rad, loc=lambda p: p.loc)),
             self.clearLayer(Layers.PIECES + Layers.CORES),
             self.clearLayer(Layers.GUIDES),
             [self.makePiece(team, Point(*coords)) for team, coords in pieces],
@@ -158,15 +178,16 @@ class Reversi(Game):
             lambda w,b: "White wins!" if w>b else "Black wins!" if b>w else "It's a tie!")(
             len([0 for p in g.layers[Layers.PIECES] if p.team == 'white']), len([0 for p in g.layers[Layers.PIECES] if p.team == 'black']))
 
-        self.makePiece = lambda t,loc: (lambda pieces,new: (
+        self.makePiece = lambda t,loc: (lambda new: (
             # we keep track of the locations a piece could fit tangent to two existing pieces
             # this is only updated when a new piece is placed, for speed
             # each such locations is in the set 'p.valid_tangents,' where p is the later of the two pieces it's tangent to
-            # when we add a piece, we need to compute all the new valid tangents:
-            setattr(new, 'valid_tangents', {pt for pc in pieces for pt in double_tangents(loc, pc) if on_board(pt) and all(pt>>p > (2*piece_rad)**2 for p in pieces)}),
-            # and remove any points the new piece overlaps:
-            [setattr(p, 'valid_tangents', {pt for pt in p.valid_tangents if pt>>loc > (2*piece_rad)**2}) for p in self.layers[Layers.PIECES]]
-            ))([p.loc for p in self.layers[Layers.PIECES]], ReversiPiece(self, t, loc))
+            # when we add a piece, we need to compute all the new valid tangents (only pieces within 4r have any):
+            setattr(new, 'valid_tangents', {pt for pc in self.index.candidates(loc, 4*piece_rad) for pt in double_tangents(loc, pc.loc) if on_board(pt) and all(pt>>p.loc > (2*piece_rad)**2 for p in self.index.candidates(pt, 2*piece_rad))}),
+            self.index.insert(new),
+            # and remove any points the new piece overlaps (a piece's valid tangents are about 2r from it, so only pieces within about 4r have any):
+            [setattr(p, 'valid_tangents', {pt for pt in p.valid_tangents if pt>>loc > (2*piece_rad)**2}) for p in self.index.candidates(loc, 5*piece_rad)],
+            ))(ReversiPiece(self, t, loc))
 
         self.nextPiece = ReversiPiece(self, None, None, Layers.NEWPIECE)
         self.nextPiece.GETteam = lambda g: g.turn
@@ -206,7 +227,7 @@ class Reversi(Game):
     def updateMove(self, pos=None):
         pos = pos or self.mousePos()
         if not self.over and pos and on_board(pos):
-            self.blockers = {p for p in self.layers[Layers.PIECES] if overlap(pos, p.loc)}
+            self.blockers = set(self.index.near(pos, 2*piece_rad))
             self.pivots, flipped = (lambda t: zip(*t) if t else ([],[]))(pivots(self.layers[Layers.PIECES], self.turn, pos))
             self.flippers = {p for ps in flipped for p in ps}
         else: self.blockers, self.pivots, self.flippers = set(), [], set()
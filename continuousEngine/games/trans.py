@@ -111,11 +111,11 @@ class TransScore(Renderable):
         
         for i in range(Constants.INITIAL_SCORE+1):
             # draw line
-            pygame.draw.line(self.game.screen, Colors.SCORE_TICK[bool(i)], (scoretopixel(i), bot), (scoretopixel(i), top), 3)
+            drew(self.game, pygame.draw.line(self.game.screen, Colors.SCORE_TICK[bool(i)], (scoretopixel(i), bot), (scoretopixel(i), top), 3), Colors.SCORE_TICK[bool(i)])
         for i, t in enumerate(self.game.teams):
             # score marker
             # pygame.draw.circle(self.game.screen, Colors.SCORE_MARKER[t], (scoretopixel(self.game.score[t]), top + (i+1.5)*Constants.SCORE_VSEP), 10)
-            self.game.screen.blit(self.markers[t], (scoretopixel(self.game.score[t]), top + i*Constants.SCORE_VSEP + self.marker_height/2))
+            drew(self.game, self.game.screen.blit(self.markers[t], (scoretopixel(self.game.score[t]), top + i*Constants.SCORE_VSEP + self.marker_height/2)), self.markers[t])
 
 # steps:
 #     start_tree: you don't have a tree yet and are placing your start peg
@@ -5,12 +5,12 @@ import continuousEngine
 import pygame
 import threading
 import socket
-import json
 import sys
 import traceback
 import asyncio
 import random, string
 import functools
+from continuousEngine.network.codec import JsonCodec, choose
 
 port = 9974
 
@@ -24,9 +24,13 @@ class NetworkGame:
     In live mode, loading state is disabled, and the game tracks the server's state. 
     Attempting to make a move results in it being sent to the server; no change is made to your local gamestate.
 
+    If shadow (a headless copy of the game) is given, the server can send just the moves instead of the whole state after each one.
+    They're applied to shadow, which always holds the server's state, and the state is requested again if it stops matching the server's hash.
     """
-    def __init__(self,game, timectrl):
+    def __init__(self,game, timectrl, shadow=None):
         self.game = game
+        self.shadow = shadow
+        self.resyncing = False
         self.server = None
         self.live_mode = False
         self.server_state = None
@@ -40,10 +44,37 @@ class NetworkGame:
             if e.action=="move":
                 self.server_history.append(self.server_state)
                 self.server_state = e.state
+                if self.shadow:
+                    self.shadow.load_state(e.state)
+                    self.resyncing = False
                 if timectrl:
                     self.timer.turn = e.state[0] # state[0] must be the current player
                     self.timer.time_left, self.timer.turn_started = e.timeinfo
                 self.update_to_server_state()
+            elif e.action=="delta":
+                # until the requested state arrives, moves can't be applied
+                if self.resyncing: return
+                self.server_history.append(self.server_state)
+                self.apply_server_move(e.move)
+                if not self.check_hash(e.hash):
+                    # the state sent back takes its place
+                    self.server_state = self.server_history.pop()
+                    return
+                if timectrl:
+                    self.timer.turn = self.server_state[0]
+                    self.timer.time_left, self.timer.turn_started = e.timeinfo
+                self.update_to_server_state()
+            elif e.action=="moves":
+                self.shadow.load_state(e.state)
+                self.server_history = []
+                self.server_state = self.shadow.save_state()
+                for m in e.moves:
+                    self.server_history.append(self.server_state)
+                    self.apply_server_move(m)
+                self.check_hash(e.hash)
+                self.update_to_server_state()
+                self.game.initialState = (self.server_history+[self.server_state])[0]
+                self.game.reset_view()
             elif e.action=="game_info":
                 self.players = {t:[] for t in self.game.teams+['spectator']}
                 for pl in e.players:
@@ -101,7 +132,8 @@ class NetworkGame:
             "action":"join",
             "user":user,
             "id":i,
-            "team":team
+            "team":team,
+            "deltas":self.shadow is not None,
             }
         self.live_mode = True
         self.server=server
@@ -128,6 +160,19 @@ class NetworkGame:
             self.game.future = []
             self.game.prep_turn()
             
+    def apply_server_move(self, m):
+        self.shadow.attemptMove(m)
+        # server_history already has every state
+        self.shadow.history = []
+        self.server_state = self.shadow.save_state()
+
+    def check_hash(self, h):
+        if self.shadow.state_hash() == h: return True
+        print("state doesn't match the server's, resyncing", flush=True)
+        self.resyncing = True
+        send(self.server, {"action":"resync"})
+        return False
+
     async def server_listener(self):
         while True:
             try:
@@ -157,25 +202,33 @@ class NetworkGame:
         else:
             self.f(m)
 
+# a connection is (reader, writer), or (reader, writer, codec) once the server has agreed to a codec
+codec_of = lambda server: server[2] if len(server) > 2 else JsonCodec
+
 def send(server, m):
     #server.sendall((json.dumps(m)+"\n").encode())
     #server.makefile(mode="w").write((json.dumps(m)+"\n"))
-    server[1].write((json.dumps(m)+"\n").encode())
+    server[1].write(codec_of(server).encode(m))
     #asyncio.get_event_loop().create_task(server[1].drain())
     #asyncio.create_task(server[1].drain())
     #await server[1].drain()
 
 async def receive(server):
-    return json.loads((await server[0].readline()).strip())
+    return await codec_of(server).read(server[0])
     #return json.loads(server.makefile(mode="r").readline().strip())
 
-async def initial_script(ip, game, game_id, team, time_control, username, new, args):
+async def initial_script(ip, game, game_id, team, time_control, username, new, deltas, codec, args):
     kwargs = {'timectrl': time_control}
 
     s = await asyncio.open_connection(host=ip, port=port, limit=2**20)
 
     print("connected to {}".format(ip))
 
+    if codec != JsonCodec.name:
+        send(s, {"action":"codec", "codec":codec})
+        s = (*s, choose((await receive(s))["codec"]))
+        print("using codec {}".format(s[2].name))
+
     send(s, {"action":"list"})
     ids = await receive(s)
     print("listing ids")
@@ -186,7 +239,10 @@ async def initial_script(ip, game, game_id, team, time_control, username, new, a
         gargs, gkwargs = await receive(s)
         timectrl = gkwargs['timectrl']
         gkwargs['timectrl']=None
-        await NetworkGame(await asyncio.get_running_loop().run_in_executor(None, functools.partial(continuousEngine.game_class(game), *gargs, **gkwargs)), timectrl).join(s, id, t, username)
+        make_game = functools.partial(continuousEngine.game_class(game), *gargs, **gkwargs)
+        # with deltas, moves are applied to a headless copy of the game too, which is checked against the server's hash
+        shadow = await asyncio.get_running_loop().run_in_executor(None, functools.partial(make_game, headless=True)) if deltas else None
+        await NetworkGame(await asyncio.get_running_loop().run_in_executor(None, make_game), timectrl, shadow).join(s, id, t, username)
 
     if game_id:
         if new and game_id in ids:
@@ -0,0 +1,35 @@
+# codecs turn protocol messages into bytes and back
+# json (the default) sends each message as a line of text
+# msgpack sends each message as a 4 byte length followed by that many bytes of msgpack, which is much smaller for states full of floats
+# a client can ask for a codec with {"action":"codec", "codec":name} before anything else, and the server answers (in json) with the codec it'll use
+
+import json, struct
+try:
+    import msgpack
+except ImportError:
+    # msgpack is optional; without it only json is available
+    msgpack = None
+
+# encode turns a message into a frame of bytes, decode turns a frame back into the message, and read reads the next frame from a stream
+class JsonCodec:
+    name = 'json'
+    encode = staticmethod(lambda message: (json.dumps(message)+"\n").encode())
+    decode = staticmethod(lambda frame: json.loads(frame))
+    @staticmethod
+    async def read(reader):
+        return JsonCodec.decode(await reader.readline())
+
+class MsgpackCodec:
+    name = 'msgpack'
+    encode = staticmethod(lambda message: (lambda data: struct.pack('>I', len(data)) + data)(msgpack.packb(message)))
+    # states can have dicts with keys that aren't strings
+    decode = staticmethod(lambda frame: msgpack.unpackb(frame[4:], strict_map_key=False))
+    @staticmethod
+    async def read(reader):
+        prefix = await reader.readexactly(4)
+        return MsgpackCodec.decode(prefix + await reader.readexactly(struct.unpack('>I', prefix)[0]))
+
+CODECS = {codec.name: codec for codec in [JsonCodec] + ([MsgpackCodec] if msgpack else [])}
+
+# the codec to use when asked for name, which is json if name isn't available
+choose = lambda name: CODECS.get(name, JsonCodec)
@@ -0,0 +1,104 @@
+# a GameHost holds the loaded games, and does everything the server needs done to them
+# everything goes in and comes out by value (moves, states, records), so a host doesn't have to be in the server's process:
+# a sharded server has a host in each of its shard processes, each with the games whose ids hash to that shard
+
+import zlib
+import continuousEngine
+
+class GameHost:
+    def __init__(self):
+        # id: Game
+        self.games = {}
+        # id: (first state, how many moves were made after it) for a game loaded from a snapshot, whose history from before the snapshot hasn't been rebuilt yet
+        # only a player joining without deltas needs the history, so it's only rebuilt then (see history)
+        self.before_snapshot = {}
+
+    # returns the teams of the new game
+    def create(self, id, name, args, kwargs):
+        self.games[id] = continuousEngine.game_class(name)(*args, **kwargs, headless=True)
+        return self.games[id].teams
+
+    # the game as it was saved: its snapshot (see journal.py), with the records since then replayed
+    # info has the game_type, args, and kwargs it was created with; returns its teams and the moves since its first state
+    def load(self, id, info, snapshot, records):
+        g = self.games[id] = continuousEngine.game_class(info["game_type"])(*info["args"], **info["kwargs"], headless=True)
+        self.before_snapshot.pop(id, None)
+        moves = []
+        if snapshot:
+            g.load_state(snapshot["state"])
+            self.before_snapshot[id] = (snapshot["first"], len(snapshot["moves"]))
+            moves = snapshot["moves"]
+        # moves were accepted when they were made, whatever the clock says now
+        enforce_time, g.enforce_time = g.enforce_time, False
+        for record in records:
+            if "move" in record:
+                g.attemptMove(record["move"])
+                moves.append(record["move"])
+            elif "override" in record:
+                g.load_state(record["override"])
+                g.history, g.future, moves = [], [], []
+                self.before_snapshot.pop(id, None)
+        g.enforce_time = enforce_time
+        return g.teams, moves
+
+    def unload(self, id):
+        self.games.pop(id, None)
+        self.before_snapshot.pop(id, None)
+
+    # None if the move is illegal, otherwise what broadcasting it needs: the state seen by each team in views, the new state's hash if hashed, and the time info
+    def move(self, id, move, views, hashed):
+        g = self.games[id]
+        if not g.attemptMove(move): return None
+        return {v: g.get_state(v) for v in views}, g.state_hash() if hashed else None, timeinfo(g)
+
+    # the state seen by team, and the time info
+    def state(self, id, team):
+        return self.games[id].get_state(team), timeinfo(self.games[id])
+
+    # the state the game's moves start from (since it was made, or last overridden)
+    first = lambda self, id: self.before_snapshot[id][0] if id in self.before_snapshot else (self.games[id].history+[self.games[id].save_state()])[0]
+
+    # the first state and the hash of the current one, for a client that replays the moves since then itself
+    def first_state(self, id):
+        return self.first(id), self.games[id].state_hash()
+
+    # a copy, since with a game thread the game can change while the history's being sent
+    # moves are the moves since the first state, for rebuilding the history from before the game's snapshot the first time it's needed
+    def history(self, id, moves):
+        g = self.games[id]
+        if id in self.before_snapshot:
+            first, n = self.before_snapshot.pop(id)
+            state, after = g.save_state(), g.history
+            enforce_time, g.enforce_time = g.enforce_time, False
+            g.history = []
+            g.load_state(first)
+            for move in moves[:n]:
+                g.attemptMove(move)
+            g.history += after
+            g.load_state(state)
+            g.enforce_time = enforce_time
+        return g.history.copy()
+
+    def override(self, id, state):
+        g = self.games[id]
+        g.load_state(state)
+        g.history, g.future = [], []
+        self.before_snapshot.pop(id, None)
+
+    # what a snapshot needs from the game, besides the moves since its first state, which the server has
+    # loading it only loads the current state, and the history before it is rebuilt from the first state and the moves if it's asked for
+    def snapshot(self, id):
+        return {"state":self.games[id].save_state(), "first":self.first(id)}
+
+timeinfo = lambda game: (game.timer.time_left, game.timer.turn_started) if game.enforce_time else None
+
+# which of n shards game id is on; crc32 is used rather than hash since it's the same in every process
+shard_of = lambda id, n: zlib.crc32(id.encode()) % n
+
+# each shard process has its own host, made when the process starts
+shard_host = None
+def start_shard():
+    global shard_host
+    shard_host = GameHost()
+def on_shard(method, *args):
+    return getattr(shard_host, method)(*args)
@@ -0,0 +1,129 @@
+# persistence for the server's games, kept in a directory with three kinds of files for each game
+#   id.info: what the game was created with (game_type, args, and kwargs) and its teams, which is all the lobby needs to know about a game that isn't loaded
+#   id.snapshot: the game (its entry in NetworkGameServer.games except players) at some point, and the generation of journal that follows it
+#     the game is kept as its current state, its first state (since it was made, or last overridden), and the moves since then, rather than as every state in its history,
+#     so compacting a long game doesn't write a state for every move, and loading it only replays the journal after it (see GameHost.load)
+#   id.generation.journal: one line of json per thing that happened to the game after that, which recovery replays on top of the snapshot
+# a record is one of
+#   {"create": info}, with the game_type, args, and kwargs the game was created with; the first record of a game with no snapshot
+#   {"move": move}, an accepted move
+#   {"override": state}, a state loaded over the game
+# writing a record only appends a line; sync makes sure everything appended has reached the disk, and is meant to be run every so often
+# compacting a game starts a new generation of journal for it and then writes a snapshot, after which the older journals aren't needed
+# if the server dies partway through, the old snapshot and every journal since it are still there, so nothing is lost
+
+import os, json
+from urllib.parse import quote, unquote
+
+class GameStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # id: (generation, open journal file)
+        self.journals = {}
+        # id: how many records have been written since the last snapshot
+        self.since_snapshot = {}
+        # journal files with records that haven't been synced
+        self.unsynced = set()
+
+    path = lambda self, id, *suffix: os.path.join(self.directory, '.'.join((quote(id, safe=''),)+tuple(map(str, suffix))))
+
+    # the generations of id's journals that exist, in order
+    def generations(self, id):
+        prefix = quote(id, safe='') + '.'
+        return sorted(int(name[len(prefix):-len('.journal')]) for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith('.journal') and name[len(prefix):-len('.journal')].isdigit())
+
+    def ids(self):
+        return {unquote(name.rsplit('.', 2)[0] if name.endswith('.journal') else name.rsplit('.', 1)[0]) for name in os.listdir(self.directory) if name.endswith(('.journal', '.snapshot'))}
+
+    def save_info(self, id, info):
+        with open(self.path(id, 'info'), 'w') as f:
+            f.write(json.dumps(info))
+
+    def info(self, id):
+        if not os.path.exists(self.path(id, 'info')): return None
+        with open(self.path(id, 'info')) as f:
+            return json.loads(f.read())
+
+    def append(self, id, record):
+        if id not in self.journals:
+            self.open(id, max(self.generations(id), default=0))
+        f = self.journals[id][1]
+        f.write(json.dumps(record)+'\n')
+        self.unsynced.add(f)
+        self.since_snapshot[id] = self.since_snapshot.get(id, 0) + 1
+
+    def open(self, id, generation):
+        f = open(self.path(id, generation, 'journal'), 'a+')
+        # a line cut off by a crash gets finished, so the next record starts on its own line
+        if f.tell() and (f.seek(f.tell()-1), f.read(1))[1] != '\n':
+            f.write('\n')
+        self.journals[id] = (generation, f)
+
+    # blocks until the disk has every record appended so far, so it should be run in an executor
+    def sync(self):
+        unsynced, self.unsynced = self.unsynced, set()
+        for f in unsynced:
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+            except ValueError:
+                # closed by compact, which synced it first
+                pass
+
+    # moves id onto a new journal, and returns a function which writes game (id's entry in NetworkGameServer.games, with its first state) as the snapshot before it
+    # the function blocks, so it should be run in an executor; game should be copied first, since the game will keep changing
+    def compact(self, id, game):
+        generation = max(self.generations(id), default=0) + 1
+        if id in self.journals:
+            old = self.journals.pop(id)[1]
+            old.flush()
+            os.fsync(old.fileno())
+            old.close()
+        self.open(id, generation)
+        self.since_snapshot[id] = 0
+        def write():
+            temp = self.path(id, 'snapshot', 'tmp')
+            with open(temp, 'w') as f:
+                f.write(json.dumps({**game, "generation": generation}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.path(id, 'snapshot'))
+            for g in self.generations(id):
+                if g < generation:
+                    os.remove(self.path(id, g, 'journal'))
+        return write
+
+    # the snapshot of id (or None if it hasn't got one) and the records since it, in order
+    def load(self, id):
+        snapshot = None
+        if os.path.exists(self.path(id, 'snapshot')):
+            with open(self.path(id, 'snapshot')) as f:
+                snapshot = json.loads(f.read())
+        records = []
+        for g in self.generations(id):
+            if snapshot and g < snapshot["generation"]: continue
+            with open(self.path(id, g, 'journal')) as f:
+                for line in f:
+                    # skipping a line cut off by a crash
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass
+        self.since_snapshot[id] = len(records)
+        return snapshot, records
+
+    # closes id's journal, for when the game is unloaded
+    def release(self, id):
+        if id in self.journals:
+            f = self.journals.pop(id)[1]
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    def close(self):
+        self.sync()
+        for _, f in self.journals.values():
+            f.close()
+        self.journals = {}
@@ -0,0 +1,56 @@
+# the server's logging, through the standard logging module with a logger called continuousEngine.server
+# log(level, message, **fields) logs message with fields, which are written after it as key=value (with the value in json)
+# records go on a queue, and a thread formats and writes them, so logging never blocks the event loop on writing to stdout
+# messages logged for everything that happens (like every message received) can be sampled, so only one in every so many of them is logged
+
+import sys, json, queue, atexit, collections, logging, logging.handlers
+from logging import INFO
+
+logger = logging.getLogger('continuousEngine.server')
+
+# a sampled message is logged the first time and then once every sample_rate times, counted in sampled
+sample_rate = 100
+sampled = collections.Counter()
+
+def log(level, message, /, sample=False, exc_info=False, **fields):
+    # messages that won't be logged are skipped before a record is made for them, which is most of what logging costs
+    if not logger.isEnabledFor(level): return
+    if sample:
+        sampled[message] += 1
+        if sample_rate > 1 and sampled[message] % sample_rate != 1: return
+    # made directly, since finding the line that logged it (as logger.log does) is slow, and the message says where it's from anyway
+    logger.handle(logger.makeRecord(logger.name, level, '', 0, message, (), sys.exc_info() if exc_info else None, extra={"fields":fields}))
+
+class FieldsFormatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, 'fields', {})
+        return super().format(record) + ''.join(' {}={}'.format(k, json.dumps(v, default=str)) for k, v in fields.items())
+
+# the record is queued as it is, rather than formatted first (as QueueHandler does), so formatting happens on the listener's thread too
+class QueueHandler(logging.handlers.QueueHandler):
+    prepare = lambda self, record: record
+
+listener = None
+
+# starts logging records at level and up to stream, with sampled messages logged once every sample times
+def start(level=INFO, sample=100, stream=sys.stdout):
+    global listener, sample_rate
+    if listener: listener.stop()
+    sample_rate = sample
+    q = queue.SimpleQueue()
+    handler = QueueHandler(q)
+    output = logging.StreamHandler(stream)
+    output.setFormatter(FieldsFormatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener = logging.handlers.QueueListener(q, output)
+    listener.start()
+
+# writes whatever's still queued
+@atexit.register
+def stop():
+    global listener
+    if listener:
+        listener.stop()
+        listener = None
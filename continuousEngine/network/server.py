@@ -10,9 +10,24 @@ e.g. create chess
 join user id side
 join the game with id id as user user on side side
 e.g. join brunnerj 6 white
+a join can also ask for deltas, in which case the server sends each accepted move with a hash of the resulting state instead of the whole state
+(only for games where every team sees the full state, i.e. that don't override get_state)
+the client applies the move itself, and if its state's hash doesn't match, sends resync to get the full state
 
 list
 returns a list of game ids and who is in them
+it can be limited to games of game_type, and to count of them starting from the start-th (in the order they were made)
+e.g. list go 0 20
+
+subscribe
+returns the list like list does (optionally only for games of game_type), and then sends the games whose info has changed
+(and the ids of the ones that are gone) whenever something changes, until the client sends unsubscribe or joins a game
+
+stats
+returns how many operations (moves, joins, and so on) each game has waiting, now and at most
+
+codec name
+switch to sending and receiving messages with the codec name (see codec.py), if the server has it; only allowed in the lobby
 
 create or join put the client in the 'in game' state
 In this state, the server will send the client the gamestate when they join and when any player makes a move
@@ -20,6 +35,9 @@ here, they can send
 move m
 make move m in the current game
 
+resync
+sends the client the full current state
+
 leave
 returns to lobby state
 
@@ -34,171 +52,469 @@ The server needs an abstract  version of the game. This must implement the follo
 
 import socketserver
 import threading
-import json
 import traceback
 import sys
 import asyncio
 import os
+import json
+import time
+import collections
+import contextlib
+import concurrent.futures
 import continuousEngine
+from continuousEngine.network.codec import JsonCodec, choose
+from continuousEngine.network.journal import GameStore
+from continuousEngine.network.host import GameHost, shard_of, start_shard, on_shard
+from continuousEngine.network.log import log
+from logging import DEBUG, INFO, WARNING, ERROR
 
 port = 9974
-SERVER_STATE_FILENAME = "serverstate"
+# the directory the server saves its games in (see journal.py)
+SERVER_STATE_DIRECTORY = "serverstore"
+# the file the server used to save all its games in, which is imported into the directory if it's there when the server starts
+LEGACY_SERVER_STATE_FILENAME = "serverstate"
+# how often (in seconds) the journals are synced to disk, and how many records a game's journal gets before it's compacted into a snapshot
+SYNC_INTERVAL = 1
+COMPACT_AFTER = 500
+# games nobody is in are unloaded after IDLE_TIMEOUT seconds, or sooner if more than MAX_LOADED_GAMES are loaded
+IDLE_TIMEOUT = 600
+MAX_LOADED_GAMES = 1000
+# how many different pages of the lobby are kept encoded until it changes
+LOBBY_CACHE_SIZE = 1000
 
 class NetworkGameServer:
-    def create_game(self, name, id, args, kwargs):
-        if id in self.list_games():
-            print('game {} already exists'.format(id), flush=True)
-            return
-        game = continuousEngine.game_class(name)(*args, **kwargs, headless=True)
-        self.games[id] = {
-            "game_type":name,
-            "players":[],
-            "game":game,
-            "args":args,
-            "kwargs":kwargs
-        }
+    async def create_game(self, name, id, args, kwargs):
+        async with self.game_lock(id):
+            if id in self.games:
+                log(WARNING, "game already exists", game=id)
+                return
+            teams = await self.on_game(id, "create", name, args, kwargs)
+            self.games[id] = {
+                "game_type":name,
+                "players":[],
+                "loaded":True,
+                "args":args,
+                "kwargs":kwargs,
+                "moves":[],
+                "teams":teams,
+            }
+        self.last_used[id] = time.monotonic()
+        if self.store:
+            self.store.save_info(id, {"game_type":name, "args":args, "kwargs":kwargs, "teams":teams})
+        self.journal(id, {"create": {"game_type":name, "args":args, "kwargs":kwargs}})
+        self.update_lobby(id)
         return id
-    async def join_game(self, i,team, user, client):
-        if i not in self.games:
-            raise Exception("game id doesn't exist")
-        player = {"user":user, "team":team, "client":client}
-        self.games[i]["players"].append(player)
-        await self.broadcast_game_info(i)
-        await self.send_gamestate(i, player, None)
-        await send(client, {"action":"history", "history":self.games[i]["game"].history})
+    # runs GameHost.method (see host.py) for game id, in its shard's process if the games are sharded, or the game thread if there is one
+    # each shard has one process, and there's one game thread, which do what they're asked in order, so a game's operations happen in the order they're asked for
+    async def on_game(self, id, method, *args):
+        if self.shards:
+            return await asyncio.get_running_loop().run_in_executor(self.shards[shard_of(id, len(self.shards))], on_shard, method, id, *args)
+        if self.game_thread:
+            return await asyncio.get_running_loop().run_in_executor(self.game_thread, getattr(self.host, method), id, *args)
+        return getattr(self.host, method)(id, *args)
+    # held while a game is changed, so its changes (and the messages and records about them) happen one at a time
+    # queue_depth counts what's holding or waiting for each game's lock, and peak_queue_depth the most there have been
+    @contextlib.asynccontextmanager
+    async def game_lock(self, id):
+        self.queue_depth[id] += 1
+        self.peak_queue_depth[id] = max(self.peak_queue_depth.get(id, 0), self.queue_depth[id])
+        try:
+            async with self.locks[id]:
+                yield
+        finally:
+            self.queue_depth[id] -= 1
+            # nothing's using the lock, so it can go
+            if not self.queue_depth[id]:
+                del self.queue_depth[id], self.locks[id]
+    # a game that isn't loaded (its "moves" are None) is loaded from the store when it's needed
+    # the caller should hold the game's lock, so it isn't loaded twice
+    async def hydrate(self, i):
+        if not self.games[i]["loaded"]:
+            await self.load_game(i)
+        self.last_used[i] = time.monotonic()
+        return self.games[i]
+    def journal(self, id, record):
+        if self.store:
+            self.store.append(id, record)
+    async def join_game(self, i,team, user, client, deltas=False):
+        # holding the lock, no move can happen between sending the player the state and them getting the moves after it
+        # (and a game that's being created is there by the time it's held)
+        async with self.game_lock(i):
+            if i not in self.games:
+                raise Exception("game id doesn't exist")
+            await self.hydrate(i)
+            player = {"user":user, "team":team, "client":client, "deltas":deltas and public_state(self.game_class(i))}
+            self.games[i]["players"].append(player)
+            await self.broadcast_game_info(i)
+            if player["deltas"]:
+                # the moves since the first state, which the client replays, are much smaller than every state in the history
+                first, h = await self.on_game(i, "first_state")
+                await send(client, {"action":"moves", "state":first, "moves":self.games[i]["moves"], "hash":h})
+            else:
+                await self.send_gamestate(i, player, None)
+                await send(client, {"action":"history", "history":await self.on_game(i, "history", self.games[i]["moves"])})
         return player
-    async def broadcast_move(self, game_id, move):
-        l = self.games[game_id]["players"].copy()
-        for player in l:
-            await self.send_gamestate(game_id, player, move)
+    # the move goes to the game and, if it's legal, to the journal and every player, before the game's next move is tried
+    async def make_move(self, game_id, move):
+        async with self.game_lock(game_id):
+            await self.hydrate(game_id)
+            l = self.games[game_id]["players"].copy()
+            cls = self.game_class(game_id)
+            result = await self.on_game(game_id, "move", move, list({view(cls, p["team"]) for p in l if not p["deltas"]}), any(p["deltas"] for p in l))
+            if result is None:
+                return False
+            self.games[game_id]["moves"].append(move)
+            self.journal(game_id, {"move": move})
+            await self.broadcast_move(game_id, move, l, *result)
+            return True
+    async def override_state(self, game_id, state):
+        async with self.game_lock(game_id):
+            await self.hydrate(game_id)
+            await self.on_game(game_id, "override", state)
+            self.games[game_id]["moves"] = []
+            self.journal(game_id, {"override": state})
+    # sending only queues a message for the connection's writer task, so broadcasts don't wait for slow clients
+    # states has the state for each view of the players in l, and h is the hash of the state if any of them are getting deltas
+    async def broadcast_move(self, game_id, move, l, states, h, timeinfo):
+        cls = self.game_class(game_id)
+        # players who see the same thing share one message, encoded once per codec: everyone getting deltas, and everyone with the same view of the state
+        messages, caches = {}, {}
+        def message(player):
+            key = "delta" if player["deltas"] else view(cls, player["team"])
+            if key not in messages:
+                messages[key] = timed({"action":"delta", "move":move, "hash":h} if player["deltas"] else {"action":"move", "state":states[key], "move":move}, timeinfo)
+            return encode_for(player["client"], messages[key], caches.setdefault(key, {}))
+        await asyncio.gather(*(self.deliver(game_id, player, message(player)) for player in l))
+    # called whenever a game's players change, to tell them (and the lobby)
     async def broadcast_game_info(self, game_id):
+        self.update_lobby(game_id)
         l = self.games[game_id]["players"].copy()
-        for player in l:
-            await send(player["client"],{"action":"game_info", **self.get_game_info(game_id)})
+        info, cache = {"action":"game_info", **self.lobby[game_id]}, {}
+        await asyncio.gather(*(self.deliver(game_id, player, encode_for(player["client"], info, cache)) for player in l))
     async def send_gamestate(self, game_id, player, move):
-        d = {"action":"move","state":self.games[game_id]["game"].get_state(player["team"]), "move":move}
-        if self.games[game_id]["game"].enforce_time:
-            d["timeinfo"] = (self.games[game_id]["game"].timer.time_left, self.games[game_id]["game"].timer.turn_started)
+        state, timeinfo = await self.on_game(game_id, "state", player["team"])
+        await self.deliver(game_id, player, encode_for(player["client"], timed({"action":"move","state":state, "move":move}, timeinfo), {}))
+    game_class = lambda self, game_id: continuousEngine.game_class(self.games[game_id]["game_type"])
+    # data is an already encoded message
+    async def deliver(self, game_id, player, data):
         try:
-            await send(player["client"],d)
+            await send_encoded(player["client"],data)
+        except asyncio.QueueFull:
+            log(WARNING, "player resynced after falling behind", game=game_id, user=player["user"])
+            await self.resync(game_id, player)
         except:
             #print(traceback.format_exc(),flush=True)
-            self.games[game_id]["players"].remove(player)
-            print("Player removed during send_gamestate",flush=True)
-            await self.broadcast_game_info(game_id)
+            if player in self.games[game_id]["players"]:
+                self.games[game_id]["players"].remove(player)
+                log(INFO, "player removed during deliver", game=game_id, user=player["user"])
+                await self.broadcast_game_info(game_id)
+    async def resync(self, game_id, player):
+        # everything still waiting to be sent is out of date once the client gets the current state
+        clear(player["client"])
+        await self.send_gamestate(game_id, player, None)
+        await self.deliver(game_id, player, encode_for(player["client"], {"action":"game_info", **self.lobby[game_id]}, {}))
     def get_game_info(self, i):
         result = self.games[i].copy()
         pl = [p.copy() for p in self.games[i]["players"]]
         result["players"] = pl
-        result["open teams"] = [t for t in result["game"].teams if t not in {p["team"] for p in pl}]
+        result["open teams"] = [t for t in result["teams"] if t not in {p["team"] for p in pl}]
         for p in pl:
             del p["client"]
-        del result["game"]
-        return result
-    def list_games(self):
-        result = {}
-        for i in self.games:
-            result[i] = self.get_game_info(i)
-        print(result,flush=True)
+            del p["deltas"]
+        del result["loaded"]
+        del result["moves"]
+        del result["teams"]
         return result
+    # how busy each game is: how many operations are holding or waiting for its lock, and the most there have been
+    def stats(self):
+        return {i:{"queue depth":self.queue_depth[i], "peak queue depth":self.peak_queue_depth.get(i, 0)} for i in self.games}
+    # the lobby has every game's info, and is only updated when some of it changes, rather than worked out for every list
+    # subscribers are told about the change soon after, with all the changes made in the meantime
+    def update_lobby(self, *ids):
+        for i in ids:
+            if i in self.games:
+                self.lobby[i] = self.get_game_info(i)
+            else:
+                self.lobby.pop(i, None)
+        self.lobby_cache = {}
+        # with nobody subscribed there's nobody to tell, and a subscriber gets the whole lobby when it subscribes
+        if self.subscribers:
+            if not self.lobby_changes:
+                asyncio.create_task(self.push_lobby())
+            self.lobby_changes.update(dict.fromkeys(ids))
+    def list_games(self, game_type=None, start=0, count=None):
+        ids = [i for i, info in self.lobby.items() if game_type in (None, info["game_type"])]
+        return {i:self.lobby[i] for i in ids[start:None if count is None else start+count]}
+    # list_games(game_type, start, count) in codec, encoded once for everyone asking for it until the lobby changes
+    def encoded_list(self, codec, game_type=None, start=0, count=None):
+        key = (game_type, start, count)
+        if key not in self.lobby_cache and len(self.lobby_cache) >= LOBBY_CACHE_SIZE:
+            self.lobby_cache = {}
+        cache = self.lobby_cache.setdefault(key, {})
+        if codec not in cache:
+            cache[codec] = codec.encode(self.list_games(*key))
+        return cache[codec]
+    async def subscribe(self, client, game_type=None):
+        self.subscribers[client] = game_type
+        await send(client, {"action":"lobby", "games":self.list_games(game_type), "removed":[]})
+    # sends each subscriber the changes to the games it's interested in
+    async def push_lobby(self):
+        changes, self.lobby_changes = self.lobby_changes, {}
+        messages, caches = {}, {}
+        def message(game_type):
+            if game_type not in messages:
+                messages[game_type] = {"action":"lobby",
+                    "games":{i:self.lobby[i] for i in changes if i in self.lobby and game_type in (None, self.lobby[i]["game_type"])},
+                    "removed":[i for i in changes if i not in self.lobby]}
+            return messages[game_type]
+        for client, game_type in list(self.subscribers.items()):
+            if not (message(game_type)["games"] or message(game_type)["removed"]): continue
+            try:
+                await send_encoded(client, encode_for(client, message(game_type), caches.setdefault(game_type, {})))
+            except asyncio.QueueFull:
+                # everything waiting is out of date once it has the whole list
+                clear(client)
+                await self.subscribe(client, game_type)
+            except:
+                self.subscribers.pop(client, None)
         
-    def __init__(self, clean=False, unsafe=False):
+    def __init__(self, clean=False, unsafe=False, max_backlog=100, shards=0, threaded=False):
         # clean: if True, don't save state
         # unsafe: if True, don't enforce players only making moves for their own team
+        # max_backlog: how many messages can be waiting to be sent to a client before it's just sent the current state instead (at least 2)
+        # shards: how many processes to run the games in, split between them by id; with 0, they're run in this process
+        # threaded: if True (and there aren't shards), run the games in a thread of their own, so connections are still handled during expensive moves
         self.games = {}
         self.clean, self.unsafe = clean, unsafe
+        self.max_backlog = max(max_backlog, 2)
+        self.store = None
+        # when each game was last used, for deciding which to unload
+        self.last_used = {}
+        # see update_lobby
+        self.lobby = {}
+        # encoded responses to list, by (game_type, start, count) and then codec
+        self.lobby_cache = {}
+        # clients subscribed to the lobby, and the game_type each wants (None for every game)
+        self.subscribers = {}
+        # ids of games that have changed since subscribers were last told (a dict, to keep them in order)
+        self.lobby_changes = {}
+        # see game_lock
+        self.locks = collections.defaultdict(asyncio.Lock)
+        self.queue_depth = collections.Counter()
+        self.peak_queue_depth = {}
+        self.host = GameHost()
+        self.shards = [concurrent.futures.ProcessPoolExecutor(1, initializer=start_shard) for _ in range(shards)]
+        self.game_thread = concurrent.futures.ThreadPoolExecutor(1) if threaded and not shards else None
+        # snapshots are written one at a time, in the order they're taken
+        self.disk = concurrent.futures.ThreadPoolExecutor(1)
 
     async def serve(self, ip="localhost"):
+        # starting the shards' processes now, rather than when their first games need them
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(shard, os.getpid) for shard in self.shards))
         if self.clean:
             self.games = {}
         else:
-            try:
-                self.load_server_state(SERVER_STATE_FILENAME)
-            except:
-                self.games = {}
-        server = await asyncio.start_server(self.a, host=ip, port=9974)
-        print("server listening",flush=True)
+            self.store = GameStore(SERVER_STATE_DIRECTORY)
+            if os.path.isfile(LEGACY_SERVER_STATE_FILENAME):
+                try:
+                    self.import_legacy_state(LEGACY_SERVER_STATE_FILENAME)
+                except:
+                    log(ERROR, "couldn't import old save file", exc_info=True, file=LEGACY_SERVER_STATE_FILENAME)
+            await self.load_server_state()
+        server = await asyncio.start_server(self.a, host=ip, port=port)
+        log(INFO, "server listening", ip=ip, port=port)
         try:
             async with server:
                 await asyncio.gather(server.serve_forever(),self.server_console(), *([] if self.clean else [self.server_save_loop()]))
         finally:
             #doesn't run if you keyboard interrupt
-            print("awoenoasioshvoihoianef",flush=True)
-    def load_server_state(self, filename):
+            log(INFO, "server stopped")
+    # only what the lobby needs is read now; games are loaded when they're joined
+    async def load_server_state(self):
+        for i in [i for i in self.games if self.games[i]["loaded"]]:
+            await self.on_game(i, "unload")
+        old, self.games = self.games, {}
+        for i in self.store.ids():
+            try:
+                info = self.store.info(i)
+                if info:
+                    self.games[i] = {"game_type":info["game_type"], "players":[], "loaded":False, "args":info["args"], "kwargs":info["kwargs"], "moves":None, "teams":info["teams"]}
+                else:
+                    # saved before info files, so the game has to be loaded to find its teams
+                    await self.load_game(i)
+                    self.store.save_info(i, {k:self.games[i][k] for k in ("game_type", "args", "kwargs", "teams")})
+                    self.last_used[i] = time.monotonic()
+            except:
+                log(ERROR, "couldn't load game", exc_info=True, game=i)
+        self.update_lobby(*old, *self.games)
+    # imports the games in a file saved by the server before it kept a store, then renames the file so they're only imported once
+    # the file has each game's state and the states before it, but not its moves, so an imported game starts from the state it was in
+    def import_legacy_state(self, filename):
         with open(filename) as f:
-            self.games = json.loads(f.read())
-            for i in self.games:
-                g = games[self.games[i]["game_type"]](headless=True)
-                g.load_state(self.games[i]["game"]["state"])
-                g.history = self.games[i]["game"]["history"]
-                self.games[i]["game"] = g                             
-    def save_server_state(self):
-        g = self.games.copy()
-        for i in g:
-            g[i] = g[i].copy()
-            g[i]["players"]=[]
-        with open(SERVER_STATE_FILENAME,'w') as f:
-            f.write(json.dumps(g, default=lambda o: {"state": o.save_state(), "history": o.history}))
+            games = json.loads(f.read())
+        ids = self.store.ids()
+        for i, game in games.items():
+            if i in ids: continue
+            self.store.append(i, {"create": {k:game[k] for k in ("game_type", "args", "kwargs")}})
+            self.store.append(i, {"override": game["game"]["state"]})
+            self.store.release(i)
+        os.replace(filename, filename + ".imported")
+        log(INFO, "imported old save file", file=filename, games=len(games))
+    # loads game i as it was saved, making its entry in games if it hasn't got one
+    async def load_game(self, i):
+        snapshot, records = self.store.load(i)
+        info = snapshot or records[0]["create"]
+        teams, moves = await self.on_game(i, "load", {k:info[k] for k in ("game_type", "args", "kwargs")}, snapshot, records)
+        self.games.setdefault(i, {"game_type":info["game_type"], "players":[], "args":info["args"], "kwargs":info["kwargs"]}).update(loaded=True, moves=moves, teams=teams)
+    # writes a snapshot of game i, without blocking for the writing
+    async def compact(self, i):
+        # holding the lock, the snapshot and the new journal start from the same move
+        async with self.game_lock(i):
+            game = {k:v for k, v in self.games[i].items() if k not in ("players", "loaded", "teams")}
+            game.update(await self.on_game(i, "snapshot"), moves=self.games[i]["moves"].copy())
+            write = self.store.compact(i, game)
+        await asyncio.get_running_loop().run_in_executor(self.disk, write)
+    async def save_server_state(self):
+        for i in [i for i in self.games if self.games[i]["loaded"]]:
+            await self.compact(i)
+        await asyncio.get_running_loop().run_in_executor(self.disk, self.store.sync)
     async def server_save_loop(self):
+        # syncing costs as much as the records since the last sync, and a game is only compacted once it's made enough moves to be worth it
         while True:
-            await asyncio.sleep(120)
-            self.save_server_state()
+            await asyncio.sleep(SYNC_INTERVAL)
+            await asyncio.get_running_loop().run_in_executor(self.disk, self.store.sync)
+            for i in [i for i, n in self.store.since_snapshot.items() if n >= COMPACT_AFTER and i in self.games and self.games[i]["loaded"]]:
+                await self.compact(i)
+            await self.unload_idle()
+    # unloads games nobody is in that haven't been used for IDLE_TIMEOUT seconds, and the least recently used ones while too many are loaded
+    async def unload_idle(self):
+        now = time.monotonic()
+        loaded = sum(g["loaded"] for g in self.games.values())
+        for used, i in sorted((self.last_used.get(i, 0), i) for i, g in self.games.items() if g["loaded"] and not g["players"]):
+            if now - used < IDLE_TIMEOUT and loaded <= MAX_LOADED_GAMES: break
+            if self.store.since_snapshot.get(i, 0):
+                await self.compact(i)
+            async with self.game_lock(i):
+                # it might have been used while the snapshot was being written
+                if self.games[i]["players"] or self.last_used.get(i, 0) != used: continue
+                self.store.release(i)
+                await self.on_game(i, "unload")
+                self.games[i].update(loaded=False, moves=None)
+            loaded -= 1
     async def server_console(self):
         while 1:
             s = await asyncio.get_running_loop().run_in_executor(None, input)
             if s=="q":
-                self.save_server_state()
+                if self.store:
+                    await self.save_server_state()
+                    self.store.close()
                 sys.exit()
-            elif s=="l":
-                self.load_server_state("a.txt")
+            elif s=="l" and self.store:
+                await self.load_server_state()
+            elif s=="s":
+                print({i:d for i, d in self.stats().items() if d["peak queue depth"]},flush=True)
 
     async def a(self,reader, writer):
-        print("connected",flush=True)
+        log(INFO, "connected", peer=writer.get_extra_info('peername'))
         game_id = None
         player = None
         server = self
-        client = (reader, writer)
+        # messages to the client wait in its queue until its writer task sends them
+        # every connection starts out with json, until the client asks for a different codec
+        client = (reader, writer, asyncio.Queue(self.max_backlog), JsonCodec)
+        writer_task = asyncio.create_task(write_loop(client))
         while True:
             try:
                 r = await receive(client)
-                print("received {}".format(r),flush=True)
+                log(DEBUG, "received", sample=True, message=r)
             except:
                 #print(traceback.format_exc(),flush=True)
-                if game_id != None:
+                writer_task.cancel()
+                server.subscribers.pop(client, None)
+                if game_id != None and player in server.games[game_id]["players"]:
                     server.games[game_id]["players"].remove(player)
                     await server.broadcast_game_info(game_id)
                 return
-            if r["action"] == "create":
-                server.create_game(r["name"], r["id"], r["args"], r["kwargs"])
+            if r["action"] == "codec":
+                # players keep the connection they joined with, so this only works in the lobby
+                codec = choose(r["codec"]) if game_id == None else client[3]
+                await send(client, {"action":"codec", "codec":codec.name})
+                if client in server.subscribers:
+                    server.subscribers[client[:3] + (codec,)] = server.subscribers.pop(client)
+                client = client[:3] + (codec,)
+            elif r["action"] == "create":
+                await server.create_game(r["name"], r["id"], r["args"], r["kwargs"])
             elif r["action"] == "join":
-                if game_id != None:
+                server.subscribers.pop(client, None)
+                if game_id != None and player in server.games[game_id]["players"]:
                     server.games[game_id]["players"].remove(player)
+                    await server.broadcast_game_info(game_id)
                 game_id = r["id"]
-                player = await server.join_game(game_id,r["team"],r["user"],client)
+                player = await server.join_game(game_id,r["team"],r["user"],client,r.get("deltas", False))
             elif r["action"] == "move":
                 if not ((self.unsafe and player["team"] == "spectator") or r["move"]["player"] == player["team"]):
-                    print("trying to move for the wrong team",flush=True)
+                    log(WARNING, "trying to move for the wrong team", game=game_id, team=player["team"], move=r["move"])
                     continue
-                if server.games[game_id]["game"].attemptMove(r["move"]):
-                    print("successfully applied move to gamestate",flush=True)
-                    await server.broadcast_move(game_id, r["move"])
+                if await server.make_move(game_id, r["move"]):
+                    log(DEBUG, "successfully applied move to gamestate", sample=True, game=game_id)
                 else:
-                    print("move was illegal",flush=True)
+                    log(INFO, "move was illegal", game=game_id, move=r["move"])
             elif r["action"] == "list":
-                await send(client, server.list_games())
+                await send_encoded(client, server.encoded_list(client[3], r.get("game_type"), r.get("start", 0), r.get("count")))
+            elif r["action"] == "subscribe":
+                await server.subscribe(client, r.get("game_type"))
+            elif r["action"] == "unsubscribe":
+                server.subscribers.pop(client, None)
+            elif r["action"] == "stats":
+                await send(client, server.stats())
             elif r["action"] == "override_state":
                 if not self.unsafe:
-                    print("trying to override state")
+                    log(WARNING, "trying to override state", game=game_id)
                     continue
-                server.games[game_id]["game"].load_state(r["state"])
-                server.games[game_id]["game"].history = []
-                server.games[game_id]["game"].future = []
+                await server.override_state(game_id, r["state"])
+            elif r["action"] == "resync":
+                await server.send_gamestate(game_id, player, None)
             elif r["action"] == "gameargs":
                 game = server.games[r["id"]]
+                server.last_used[r["id"]] = time.monotonic()
                 await send(client, [game["args"], game["kwargs"]])
 
+# does every team see the whole state of a game of game_class? deltas only work if so, since clients apply moves to their own copy of it
+public_state = lambda game_class: game_class.get_state is continuousEngine.Game.get_state
+# teams with the same view get the same state from get_state
+view = lambda game_class, team: None if public_state(game_class) else team
+# d with the time info of the game it's about, if it has any
+timed = lambda d, timeinfo: d if timeinfo is None else {**d, "timeinfo":timeinfo}
+
+# the bytes of message in client's codec, from cache if another client with the same codec already needed them
+def encode_for(client, message, cache):
+    if client[3] not in cache:
+        cache[client[3]] = client[3].encode(message)
+    return cache[client[3]]
+
 async def send(client, message):
-    client[1].write((json.dumps(message)+"\n").encode())
-    await client[1].drain()
+    await send_encoded(client, client[3].encode(message))
+# raises asyncio.QueueFull if the client already has max_backlog messages waiting
+async def send_encoded(client, data):
+    if client[1].is_closing():
+        raise ConnectionResetError()
+    client[2].put_nowait(data)
+# drops every message waiting to be sent to the client
+def clear(client):
+    while not client[2].empty():
+        client[2].get_nowait()
+# sends a client's queued messages, as many at a time as are waiting
+async def write_loop(client):
+    try:
+        while True:
+            messages = [await client[2].get()]
+            while not client[2].empty():
+                messages.append(client[2].get_nowait())
+            client[1].writelines(messages)
+            await client[1].drain()
+    except asyncio.CancelledError:
+        raise
+    except:
+        client[1].close()
 async def receive(client):
-    return json.loads((await client[0].readline()).strip())
+    return await client[3].read(client[0])
@@ -8,5 +8,5 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     packages=setuptools.find_packages(),
-    scripts=['bin/continuous-battlecode', 'bin/continuous-client', 'bin/continuous-server', 'bin/continuous-game']
+    scripts=['bin/continuous-battlecode', 'bin/continuous-client', 'bin/continuous-server', 'bin/continuous-game', 'bin/continuous-bench']
 )
\ No newline at end of file
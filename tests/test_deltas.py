@@ -0,0 +1,59 @@
+# with deltas, players are sent moves, and read the runner's state from where it's shared when they need it
+
+import sys, random, textwrap
+import pytest
+import continuousEngine
+from continuousEngine.battlecode import examplegoplayer
+from continuousEngine.battlecode.player import PlayerTemplate
+from continuousEngine.battlecode.run import play
+from continuousEngine.battlecode.shared import SharedState
+
+go = continuousEngine.game_class('go')
+
+# a go player that checks its game against the runner's state after every move
+CHECKING = '''
+from continuousEngine.battlecode.examplegoplayer import Player as GoPlayer
+class Player(GoPlayer):
+    def on_move(self, move, state):
+        assert state is None and self.state() == self.game.save_state()
+'''
+
+@pytest.fixture
+def checking(tmp_path, monkeypatch):
+    (tmp_path/'checkingplayer.py').write_text(textwrap.dedent(CHECKING))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import checkingplayer
+    yield checkingplayer
+    sys.modules.pop('checkingplayer', None)
+
+def test_state_on_demand(checking):
+    ending, _, culprit, _ = play(go(headless=True), go, 'go', [checking, checking], 30, deltas=True)
+    assert (ending, culprit) == ('draw', None)
+
+def test_resync_from_shared():
+    random.seed(0)
+    game = go(headless=True)
+    player = PlayerTemplate(go, 'go', 'black')
+    player._receive_state(game.get_state('black'))
+    mover = examplegoplayer.Player(go, 'go', 'black')
+    mover._receive_state(game.get_state('black'))
+    # the player's copy misses a move
+    move = mover.make_move()
+    assert game.attemptMove(move)
+    mover._receive_move(move, None)
+    shared = SharedState()
+    try:
+        mover.team = game.turn
+        move = mover.make_move()
+        assert game.attemptMove(move)
+        # without the hash, the player can't tell
+        assert player._receive_delta(move, None, shared.write(game.get_state('black')))
+        assert player.game.save_state() != game.save_state()
+        assert player.state() == game.save_state()
+        assert player._receive_delta(move, game.state_hash(), shared.write(game.get_state('black')))
+        assert player.game.save_state() == game.save_state()
+        # and with nowhere to read the state from, it waits for _resync
+        player.game.load_state(go(headless=True).save_state())
+        assert not player._receive_delta(move, game.state_hash())
+    finally:
+        shared.close()
@@ -0,0 +1,92 @@
+from continuousEngine import Game, Renderable, Point, differ
+
+def test_snapshot_sees_list_changed_in_place():
+    game = Game(headless=True)
+    obj = Renderable(game, 0)
+    obj.points = [Point(0, 0), Point(1, 1)]
+    before = obj.snapshot()
+    obj.points.append(Point(2, 2))
+    assert differ(obj.snapshot(), before)
+
+def test_snapshot_sees_point_changed_in_place():
+    game = Game(headless=True)
+    obj = Renderable(game, 0)
+    obj.loc = Point(0, 0)
+    before = obj.snapshot()
+    obj.loc.x = 1
+    assert differ(obj.snapshot(), before)
+
+def test_snapshot_sees_list_from_get_changed_in_place():
+    game = Game(headless=True)
+    obj = Renderable(game, 0)
+    colors = [(0, 0, 0)]
+    obj.GETcolors = lambda g: colors
+    before = obj.snapshot()
+    colors[0] = (255, 255, 255)
+    assert differ(obj.snapshot(), before)
+
+def test_unchanged_snapshot_is_the_same():
+    game = Game(headless=True)
+    obj = Renderable(game, 0)
+    obj.points = [Point(0, 0), {"a": [1, 2]}]
+    assert not differ(obj.snapshot(), obj.snapshot())
+
+# frames are only drawn after something changes: an event, setting an attribute of a renderable, or a ticking renderable changing by itself
+
+import os
+import pytest
+import pygame
+
+# a renderable that notes each time it's rendered in renders
+class Counting(Renderable):
+    def __init__(self, game, layer, renders):
+        super().__init__(game, layer)
+        self.render = lambda: renders.append(self)
+
+@pytest.fixture
+def shown():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    game = Game()
+    game.render()
+    return game
+
+def test_idle_frame_evaluates_nothing():
+    game = Game(headless=True)
+    calls = []
+    obj = Renderable(game, 0)
+    obj.GETcolor = lambda g: calls.append(1)
+    game.needRedraw, game.last_ticks = False, []
+    game.render()
+    assert calls == []
+
+def test_setting_an_attribute_needs_a_frame():
+    game = Game(headless=True)
+    obj = Renderable(game, 3)
+    game.needRedraw = False
+    changes = game.changes.get(3)
+    obj.color = (1, 2, 3)
+    assert game.needRedraw and game.changes[3] == changes + 1
+
+def test_frames_drawn_only_after_changes(shown):
+    renders = []
+    obj = Counting(shown, 0, renders)
+    shown.render()
+    shown.render()
+    assert len(renders) == 1
+    obj.color = (0, 0, 0)
+    shown.render()
+    assert len(renders) == 2
+
+def test_ticking_renderable_changing_by_itself(shown):
+    renders = []
+    obj = Counting(shown, 0, renders)
+    now = [0]
+    obj.GETtime = lambda g: now[0]
+    shown.ticking.append(obj)
+    shown.render()
+    shown.render()
+    assert len(renders) == 1
+    now[0] = 1
+    shown.render()
+    assert len(renders) == 2
@@ -0,0 +1,37 @@
+# cpu budgets stop a player while it's still going, even with no wall clock budget
+
+import sys, time, textwrap
+import pytest
+import continuousEngine
+from continuousEngine.battlecode.sandbox import PlayerProcess, OverBudget
+
+LOOPING = '''
+from continuousEngine.battlecode.player import PlayerTemplate
+class Player(PlayerTemplate):
+    def make_move(self):
+        while 1: pass
+'''
+
+@pytest.fixture
+def looping(tmp_path, monkeypatch):
+    (tmp_path/'loopingplayer.py').write_text(textwrap.dedent(LOOPING))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import loopingplayer
+    yield loopingplayer
+    sys.modules.pop('loopingplayer', None)
+
+def over_budget(module, **budget):
+    player = PlayerProcess(module, continuousEngine.game_class('go'), 'go', 'black', **budget)
+    start = time.perf_counter()
+    try:
+        with pytest.raises(OverBudget):
+            player.make_move()
+    finally:
+        player.close()
+    return time.perf_counter() - start
+
+def test_move_cpu(looping):
+    assert over_budget(looping, move_cpu=0.2) < 5
+
+def test_game_cpu(looping):
+    assert over_budget(looping, game_cpu=0.2) < 5
@@ -0,0 +1,29 @@
+# Voronoi.from_points gives the same diagram as adding the points one at a time, for points in general position
+
+import random
+from continuousEngine.core.geometry import Point, Voronoi
+
+box = (Point(-10,-10), Point(10,10))
+
+def same_diagram(points):
+    swept = Voronoi.from_points(points, box)
+    added = Voronoi(*box)
+    for p in points:
+        added.add(p)
+    assert set(swept.points) == set(added.points)
+    neighbours = lambda diagram: {p:set(map(str, diagram.contiguities[p])) for p in points}
+    assert neighbours(swept) == neighbours(added)
+    for q in [Point(x/3, y/3) for x in range(-27, 28) for y in range(-27, 28)]:
+        assert q>>swept.nearest(q) == q>>added.nearest(q)
+
+def test_random():
+    random.seed(0)
+    same_diagram([Point(random.uniform(-9,9), random.uniform(-9,9)) for _ in range(300)])
+
+def test_nearly_a_grid():
+    # close to, but not quite, many points on each line and circle
+    random.seed(1)
+    same_diagram([Point(x+random.uniform(-.01,.01), y+random.uniform(-.01,.01)) for x in range(-4,5) for y in range(-4,5)])
+
+def test_collinear():
+    same_diagram([Point(x, 0) for x in range(-5, 6)])